@@ -0,0 +1,326 @@
+'''
+Benchmark of DataBase on synthetic data.
+
+Generates codes.csv and time.csv for every combination of number
+of codes and years of history, measures main DataProcessor
+methods and Visualizer methods (headless, Agg backend) and saves
+results to JSON file. Results of previous run can be compared
+with current ones to find regressions. Exit status is 1 if there
+are regressions or startup with time commands is over budget.
+
+    python benchmark.py --codes 10 1000 --years 1 10
+    python benchmark.py --full --output new.json --compare old.json
+'''
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+#time commands must run without pandas, numpy and matplotlib
+#(see run_startup and tests/test_startup.py)
+STARTUP_BUDGET = 0.5
+STARTUP_COMMANDS = (['/w'], ['/p'], ['/c'], ['/h', '90'], ['/p'], ['/w'])
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib')
+STARTUP_SCRIPT = '''
+import json, sys
+import run_database
+db = run_database.DataBase(path=sys.argv[1])
+for command in {commands!r}:
+    db.execute(command)
+print(json.dumps([name for name in {modules!r} if name in sys.modules]))
+'''.format(commands=STARTUP_COMMANDS, modules=HEAVY_MODULES)
+
+
+def make_codes(number, rnd):
+    '''
+    Return list of tuples (task, code, priority) of random
+    codes tree with number codes (root code is "0").
+    '''
+    codes = ['0']
+    childs = {'0': 0}
+    while len(codes) < number:
+        parent = rnd.choice(codes)
+        code = '{}_{}'.format(parent, childs[parent])
+        childs[parent] += 1
+        childs[code] = 0
+        codes.append(code)
+    return [('task{}'.format(idx), code, round(rnd.uniform(0, 3), 1))
+            for idx, code in enumerate(codes)]
+
+
+def make_days(codes, years, tasks, rnd, end=None):
+    '''
+    Return list of time.csv rows (tuples of date, tasks, ratios and
+    total) for years of history ending at end (yesterday by default).
+    Day has from 1 to tasks tasks, about every 7th day is skipped.
+    '''
+    end = end or dt.date.today() - dt.timedelta(days=1)
+    parents = {code.rsplit('_', 1)[0] for code in codes if '_' in code}
+    leaves = [code for code in codes if code not in parents]
+    rows = []
+    for day in range(years * 365, -1, -1):
+        if rnd.random() < 0.15:
+            continue
+        day_codes = rnd.sample(leaves, rnd.randint(1, min(tasks,
+                                                          len(leaves))))
+        weights = [rnd.random() + 0.1 for _ in day_codes]
+        ratios = [round(i / sum(weights), 2) for i in weights]
+        rows.append(((end - dt.timedelta(days=day)).strftime('%Y-%m-%d'),
+                     ' '.join(day_codes), ' '.join(map(str, ratios)),
+                     round(rnd.uniform(0.5, 10), 2)))
+    return rows
+
+
+def write_data(path, codes, years, tasks, seed=0):
+    '''
+    Write synthetic codes.csv and time.csv to path.
+    Return tuple of number of codes and days.
+    '''
+    rnd = random.Random(seed)
+    codes_rows = make_codes(codes, rnd)
+    days = make_days([row[1] for row in codes_rows], years, tasks, rnd)
+    with open(os.path.join(path, 'codes.csv'), 'w') as file:
+        file.write('task,code,priority\n')
+        file.writelines('{},{},{}\n'.format(*row) for row in codes_rows)
+    with open(os.path.join(path, 'time.csv'), 'w') as file:
+        file.write('date,tasks,ratios,total\n')
+        file.writelines('{},{},{},{}\n'.format(*row) for row in days)
+    return len(codes_rows), len(days)
+
+
+def measure(func, repeat):
+    '''
+    Call func repeat times. Return list of durations (seconds).
+    '''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def get_cases(db, task):
+    '''
+    Return list of tuples (name, prepare, func) of measured
+    calls for loaded DataBase db. prepare is called before every
+    call of func (its time is not counted). task is name of
+    task for plots of tasks.
+    db is used in default configuration (snapshot file, every
+    /add is written at once).
+    '''
+    import matplotlib.pyplot as plt
+    raw_time_df = db.get_raw_time_df(db.time_df, db.tasks_df)
+
+    def raw_load():
+        db.load_data(preprocessing=False)
+
+    def cold_close():
+        db.close_data()
+        os.remove(db.path + db.snapshotFile)
+
+    def queue_row():
+        flush_size = db.flushSize
+        db.flushSize = float('inf')
+        db.upd_time_df(task, '0.5')
+        db.flushSize = flush_size
+
+    def plot(method, *args, **kwargs):
+        def func():
+            method(*args, **kwargs)
+            plt.close('all')
+        return func
+
+    cases = [
+        ('load_data', db.close_data,
+         lambda: db.load_data(preprocessing=True)),
+        ('load_data_cold', cold_close,
+         lambda: db.load_data(preprocessing=True)),
+        ('load_data_raw', None, raw_load),
+        ('time_df_preprocessing', raw_load,
+         lambda: db.time_df_preprocessing(direction='forward')),
+        ('parse_tasks', None, lambda: db.get_tasks_df(raw_time_df)),
+        ('serialize_tasks', None,
+         lambda: db.get_raw_time_df(db.time_df, db.tasks_df)),
+        ('set_summary_df', lambda: db.load_data(preprocessing=True),
+         db.set_summary_df),
+        ('upd_time_df', None, lambda: db.upd_time_df(task, '0.5')),
+        ('flush_data', queue_row, db.flush_data),
+        ('close_session', queue_row, db.close_session),
+        ('make_recommendation', None, db.make_recommendation),
+        ('get_range_time', None, lambda: db.get_range_time(
+            db.time_df.index[len(db.time_df) // 3], None)),
+        ('lineplot', None, plot(db.lineplot)),
+        ('lineplot_task', None, plot(db.lineplot, task)),
+        ('expanding_lineplot', None, plot(db.expanding_lineplot)),
+        ('expanding_lineplot_task', None,
+         plot(db.expanding_lineplot, task)),
+        ('scatterplot', None, plot(db.scatterplot)),
+        ('scatterplot_task', None, plot(db.scatterplot, task)),
+        ('hist_of_summary_hours', None, plot(db.hist_of_summary_hours)),
+        ('hist_of_hours_per_day', None, plot(db.hist_of_hours_per_day)),
+        ('work_session_hist', None, plot(db.work_session_hist)),
+        ('work_session_hist_task', None,
+         plot(db.work_session_hist, task=task)),
+    ]
+    return cases
+
+
+def run_size(codes, years, tasks, repeat, storage='csv', seed=0):
+    '''
+    Generate data of size in temporary dir and measure cases
+    (see get_cases). Return list of result dicts.
+    '''
+    from run_database import DataBase
+    path = tempfile.mkdtemp(prefix='bench_')
+    try:
+        codes, days = write_data(path, codes, years, tasks, seed)
+        db = DataBase(path=os.path.join(path, ''), storage=storage)
+        db.load_data(preprocessing=True)
+        task = db.summary_df.task[db.get_end_codes()].iloc[0]
+        results = []
+        for name, prepare, func in get_cases(db, task):
+            times = []
+            for _ in range(repeat):
+                if prepare is not None:
+                    prepare()
+                times += measure(func, 1)
+            results.append({'name': name, 'codes': codes, 'years': years,
+                            'days': days, 'tasks': tasks,
+                            'storage': storage,
+                            'min_s': min(times),
+                            'median_s': statistics.median(times)})
+            print('{:<26}{:>7} codes{:>4} years{:>10.2f} ms'.format(
+                name, codes, years, min(times) * 1000))
+        return results
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def run_startup(repeat, budget=STARTUP_BUDGET):
+    '''
+    Measure time of python process which imports run_database
+    and runs time commands (STARTUP_COMMANDS) in temporary dir.
+    Return result dict, its "failed" key is True if min time is
+    over budget (seconds) or heavy modules (HEAVY_MODULES)
+    were imported.
+    '''
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    path = tempfile.mkdtemp(prefix='bench_')
+    try:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, '-c', STARTUP_SCRIPT,
+                 os.path.join(path, '')], cwd=cwd, check=True,
+                capture_output=True, text=True).stdout
+            times.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    modules = json.loads(output.splitlines()[-1])
+    failed = min(times) > budget or bool(modules)
+    print('{:<26}{:>31.2f} ms{}'.format(
+        'startup', min(times) * 1000,
+        ' <- over budget {} s or imports {}'.format(budget, modules)
+        if failed else ''))
+    return {'name': 'startup', 'min_s': min(times),
+            'median_s': statistics.median(times), 'modules': modules,
+            'failed': failed}
+
+
+def get_key(result):
+    '''Return key of result for comparison of runs'''
+    return '/'.join(str(result[key]) for key in
+                    ('name', 'codes', 'years', 'tasks', 'storage')
+                    if key in result)
+
+
+def compare(results, baseline, threshold):
+    '''
+    Print ratio of min times of results and baseline results
+    (lists of result dicts). Return list of keys of results which
+    are slower than threshold * baseline.
+    '''
+    old = {get_key(i): i['min_s'] for i in baseline}
+    slower = []
+    for result in results:
+        key = get_key(result)
+        if key not in old or not old[key]:
+            continue
+        ratio = result['min_s'] / old[key]
+        mark = ''
+        if ratio > threshold:
+            slower.append(key)
+            mark = ' <- slower'
+        print('{:<50}{:>8.2f}x{}'.format(key, ratio, mark))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--codes', type=int, nargs='+', default=[10, 1000],
+                        help='numbers of codes')
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 10],
+                        help='years of history')
+    parser.add_argument('--tasks', type=int, default=4,
+                        help='max number of tasks per day')
+    parser.add_argument('--full', action='store_true',
+                        help='10 to 10000 codes, 1 to 50 years')
+    parser.add_argument('--storage', default='csv',
+                        choices=['csv', 'mmap', 'sqlite'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json',
+                        help='file to save results')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='results of previous run')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown ratio to report as regression')
+    parser.add_argument('--startup-budget', type=float,
+                        default=STARTUP_BUDGET,
+                        help='max time (seconds) of startup with '
+                             'time commands')
+    args = parser.parse_args(argv)
+    if args.full:
+        args.codes = [10, 100, 1000, 10000]
+        args.years = [1, 10, 50]
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import pandas as pd
+    import numpy as np
+
+    results = [run_startup(args.repeat, args.startup_budget)]
+    for codes in args.codes:
+        for years in args.years:
+            results += run_size(codes, years, args.tasks, args.repeat,
+                                args.storage)
+
+    report = {'date': dt.datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(),
+              'pandas': pd.__version__, 'numpy': np.__version__,
+              'matplotlib': matplotlib.__version__,
+              'results': results}
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=1)
+    print('Results were saved to {}'.format(args.output))
+
+    status = int(results[0]['failed'])
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        if compare(results, baseline, args.threshold):
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+class CodeTree():
+    '''
+    Index of tasks tree-graph built from codes
+    (see codes.csv "code" column).
+    Code "X_Y_Z" is a child of nearest existing code from
+    "X_Y", "X". Codes without existing ancestors are roots.
+    '''
+    def __init__(self, codes=()):
+        self.parents = {}
+        self.childs = {}
+        self.roots = []
+        for code in sorted(set(codes), key=self.depth):
+            self.add(code)
+
+    def __contains__(self, code):
+        return code in self.parents
+
+    def __len__(self):
+        return len(self.parents)
+
+    @staticmethod
+    def depth(code):
+        '''Return depth of code (number of "_" separators)'''
+        return code.count('_')
+
+    def add(self, code):
+        '''
+        Add code to tree. Existing codes under new code
+        (if it was missing intermediate node) are moved to it.
+        '''
+        if code in self.parents:
+            return
+        parent = code
+        while '_' in parent:
+            parent = parent.rsplit('_', 1)[0]
+            if parent in self.parents:
+                break
+        else:
+            parent = None
+
+        siblings = self.roots if parent is None else self.childs[parent]
+        prefix = code + '_'
+        moved = [i for i in siblings if i.startswith(prefix)]
+        siblings[:] = [i for i in siblings if not i.startswith(prefix)]
+        siblings.append(code)
+        for child in moved:
+            self.parents[child] = code
+
+        self.parents[code] = parent
+        self.childs[code] = moved
+
+    def parent(self, code):
+        '''Return parent code or None for root'''
+        return self.parents[code]
+
+    def children(self, code):
+        '''Return list of child codes'''
+        return self.childs[code]
+
+    def is_leaf(self, code):
+        '''Return True if code has not children'''
+        return not self.childs[code]
+
+    def ancestors(self, code):
+        '''Return list of ancestors of code (from parent to root)'''
+        ans = []
+        code = self.parents[code]
+        while code is not None:
+            ans.append(code)
+            code = self.parents[code]
+        return ans
+
+    def descendants(self, code, with_self=True):
+        '''Return list of all codes of subtree of code'''
+        ans = [code] if with_self else []
+        stack = list(reversed(self.childs[code]))
+        while stack:
+            code = stack.pop()
+            ans.append(code)
+            stack.extend(reversed(self.childs[code]))
+        return ans
+
+    def leaves(self):
+        '''Return list of end codes of tree'''
+        return [code for code, childs in self.childs.items()
+                if not childs]
+
+    def bottom_up(self):
+        '''Return list of codes ordered from deepest to roots'''
+        return sorted(self.parents, key=self.depth, reverse=True)
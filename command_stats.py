@@ -0,0 +1,77 @@
+from collections import deque
+import time
+
+
+class CommandStats():
+    '''
+    impurity class for measuring latency and I/O of user commands.
+    Storage methods count rows and bytes of I/O by self.count_io,
+    counters are added to stats of command which was running.
+    Last statsSize latencies of each command are kept.
+    Need deque from collections; time.
+    '''
+    statsSize = 1000
+    ioKeys = ('rows_read', 'rows_written', 'bytes_read', 'bytes_written')
+
+    def count_io(self, **counts):
+        '''
+        Add counts (keywords from ioKeys, numbers) to I/O
+        counters of current command.
+        '''
+        for key, value in counts.items():
+            self.io_counter[key] += int(value)
+
+    def reset_io(self):
+        '''Set I/O counters of current command to zero'''
+        self.io_counter = dict.fromkeys(self.ioKeys, 0)
+
+    def add_command_stats(self, command, latency):
+        '''
+        Add latency (seconds) and I/O counters of finished
+        command to self.command_stats.
+        '''
+        if command not in self.command_stats:
+            self.command_stats[command] = dict(
+                dict.fromkeys(self.ioKeys, 0), calls=0,
+                latency=deque(maxlen=self.statsSize))
+        stats = self.command_stats[command]
+        stats['calls'] += 1
+        stats['latency'].append(latency)
+        for key in self.ioKeys:
+            stats[key] += self.io_counter[key]
+        self.reset_io()
+
+    def timed(self, command, func, *args):
+        '''
+        Call func(*args) as command and add its latency and I/O
+        to stats. Return result of func.
+        '''
+        self.reset_io()
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.add_command_stats(command, time.perf_counter() - start)
+
+    @staticmethod
+    def percentile(values, q):
+        '''Return q-th percentile (nearest rank) of sorted values'''
+        idx = max(int(-(-len(values) * q // 100)) - 1, 0)
+        return values[idx]
+
+    def get_stats(self):
+        '''
+        Return dict of stats of commands: number of calls,
+        p50, p95 and max latency (milliseconds) of last calls
+        and I/O counters (see ioKeys).
+        '''
+        ans = {}
+        for command, stats in sorted(self.command_stats.items()):
+            latency = sorted(stats['latency'])
+            ans[command] = dict(
+                calls=stats['calls'],
+                p50_ms=round(self.percentile(latency, 50) * 1000, 3),
+                p95_ms=round(self.percentile(latency, 95) * 1000, 3),
+                max_ms=round(latency[-1] * 1000, 3),
+                **{key: stats[key] for key in self.ioKeys})
+        return ans
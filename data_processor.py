@@ -1,26 +1,182 @@
-import datetime as dt
-import re
+from code_tree import CodeTree
 
-import numpy as np
-import pandas as pd
+from collections import OrderedDict
+import datetime as dt
+import os
+import pickle
 
 
 class DataProcessor():
     '''
     impurity class for working with data.
-    Need datetime as dt; re; numpy as np; pandas as pd.
+    Task codes of self.tasks_df and task names and codes of
+    self.summary_df are categorical (see self.compact_tasks_df),
+    time of tasks is float32.
+    Need OrderedDict; datetime as dt; os; pickle; CodeTree.
+    numpy and pandas are imported by methods on first use.
     '''
+    storage = 'csv'
+    tailChunk = 4096
+    snapshotFile = 'snapshot.pkl'
+    snapshotVersion = 2
+    snapshotStale = False
+    snapshotAttrs = ('time_df', 'tasks_df', 'codes_df',
+                     'summary_df', 'summary_idx', 'code_tree')
+
+    lazyAttrs = snapshotAttrs
+    flushSize = 1
+    seriesCacheSize = 32
+    recommendRounds = 10
+
+    def __getattr__(self, name):
+        '''
+        Load data on first access to attributes from lazyAttrs
+        (see self.load_data). Data is not loaded before it is
+        needed by some command and then stays in memory.
+        '''
+        if name not in self.lazyAttrs:
+            raise AttributeError(name)
+        self.load_data(preprocessing=True)
+        return self.__dict__[name]
+
     def load_data(self, preprocessing=True):
         '''
         Load data from .csv as pandas.DataFrame objects and
         set it as attributes.
         preprocessing flad for time_df preprocessing
         (False for raw .csv reading (faster))
+
+        Preprocessed data is loaded from storage selected by
+        storage attribute ("csv", "mmap" or "sqlite", see
+        MmapStorage and SqliteStorage),
+        it also sets summary_df (see self.set_summary_df) and
+        is saved to snapshot. Next loads read snapshot while
+        storage files are not changed (see self.load_snapshot).
         '''
-        self.time_df = pd.read_csv(self.path + 'time.csv')
-        self.codes_df = pd.read_csv(self.path + 'codes.csv')
+        import pandas as pd
+        pd.set_option('mode.chained_assignment', None)
+        self.dataVersion += 1
+        if preprocessing and self.storage == 'sqlite' and \
+           os.path.exists(self.path + self.sqliteFile):
+            #counter is read before data (see self.sync_sqlite)
+            self.sqliteWrites = self.get_sqlite_writes()
+        if preprocessing and self.load_snapshot():
+            return
+        if preprocessing and self.storage == 'mmap':
+            self.load_mmap()
+        elif preprocessing and self.storage == 'sqlite':
+            self.load_sqlite()
+        else:
+            self.time_df = pd.read_csv(self.path + 'time.csv')
+            self.codes_df = pd.read_csv(self.path + 'codes.csv')
+            self.count_io(rows_read=len(self.time_df) + len(self.codes_df),
+                          bytes_read=self.get_files_size(
+                              ['time.csv', 'codes.csv']))
+            if preprocessing:
+                self.time_df_preprocessing(direction='forward')
         if preprocessing:
-            self.time_df_preprocessing(direction='forward')
+            self.set_summary_df()
+            self.save_snapshot()
+
+
+    def get_storage_files(self):
+        '''Return list of files of selected storage'''
+        if self.storage == 'mmap':
+            return [self.mmapFile, self.mmapMetaFile, 'codes.csv']
+        elif self.storage == 'sqlite':
+            return [self.sqliteFile]
+        elif self.storage == 'csv':
+            return ['time.csv', 'codes.csv']
+        else:
+            raise ValueError
+
+    def get_files_size(self, filenames):
+        '''Return total size (bytes) of existing files of self.path'''
+        return sum(os.path.getsize(self.path + filename)
+                   for filename in filenames
+                   if os.path.exists(self.path + filename))
+
+    def write_data(self):
+        '''
+        Write all loaded data (preprocessed) to selected storage.
+        '''
+        if self.storage == 'sqlite':
+            self.write_sqlite()
+            return
+        if self.storage == 'mmap':
+            self.write_mmap()
+            rows, files = 0, ['codes.csv']
+        else:
+            self.get_raw_time_df(self.time_df, self.tasks_df).to_csv(
+                self.path + 'time.csv', index_label='date')
+            rows, files = len(self.time_df), ['time.csv', 'codes.csv']
+        self.codes_df.to_csv(self.path + 'codes.csv', index=False)
+        self.count_io(rows_written=rows + len(self.codes_df),
+                      bytes_written=self.get_files_size(files))
+
+
+    def get_snapshot_key(self):
+        '''
+        Return tuple of size and modification time of storage
+        files and round places (and writes counter of database
+        for sqlite storage). Snapshot is valid only for same key.
+        '''
+        key = [self.snapshotVersion, self.roundPlaces, self.storage]
+        for filename in self.get_storage_files():
+            stat = os.stat(self.path + filename)
+            key += [stat.st_size, stat.st_mtime_ns]
+        if self.storage == 'sqlite':
+            key.append(self.get_sqlite_writes())
+        return tuple(key)
+
+    def save_snapshot(self):
+        '''
+        Save preprocessed data, summary_df and code_tree to
+        snapshot file (pickle). Do nothing if snapshotFile is None
+        or there are not flushed rows (see self.flush_data).
+        '''
+        if self.snapshotFile is None or self.pendingRows or \
+           self.pendingCodes:
+            return
+        snapshot = {name: getattr(self, name)
+                    for name in self.snapshotAttrs}
+        snapshot['key'] = self.get_snapshot_key()
+        with open(self.path + self.snapshotFile, 'wb') as file:
+            pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.count_io(bytes_written=file.tell())
+        self.snapshotStale = False
+
+    def close_session(self):
+        '''
+        Flush pending data and save snapshot if it is stale
+        (data was written after loading). Call at exit.
+        '''
+        self.flush_data()
+        if self.snapshotStale and 'tasks_df' in self.__dict__:
+            self.save_snapshot()
+
+    def load_snapshot(self):
+        '''
+        Set attributes from snapshot file if it exists and
+        .csv files were not changed after its saving.
+        Any error of reading snapshot (e.g. unpickling of objects
+        of other pandas version) means that it is not loaded.
+        Return True if snapshot was loaded.
+        '''
+        if self.snapshotFile is None:
+            return False
+        try:
+            with open(self.path + self.snapshotFile, 'rb') as file:
+                snapshot = pickle.load(file)
+                self.count_io(bytes_read=file.tell())
+            if snapshot['key'] != self.get_snapshot_key():
+                return False
+            values = [snapshot[name] for name in self.snapshotAttrs]
+        except Exception:
+            return False
+        for name, value in zip(self.snapshotAttrs, values):
+            setattr(self, name, value)
+        return True
 
         
     def save_data(self, preprocessing=True):
@@ -34,12 +190,19 @@ class DataProcessor():
         else:
             self.time_df.to_csv(self.path + 'time.csv', index=False)
         self.codes_df.to_csv(self.path + 'codes.csv', index=False)
+        self.count_io(rows_written=len(self.time_df) + len(self.codes_df),
+                      bytes_written=self.get_files_size(
+                          ['time.csv', 'codes.csv']))
         self.close_data()
 
         
     def close_data(self):
-        del self.time_df
-        del self.codes_df
+        '''
+        Delete loaded data (lazyAttrs) from DataProcessor obj.
+        It will be loaded again on next access (see self.__getattr__).
+        '''
+        for name in self.lazyAttrs:
+            self.__dict__.pop(name, None)
 
         
     def time_df_preprocessing(self, direction):
@@ -48,127 +211,295 @@ class DataProcessor():
         Set date column of self.time pandas.DataFrame as
         datetime index;
         Fill missing days of self.time_df;
-        Convert self.time_df columns elements from strings 
-        to tuples.
+        Move self.time_df tasks and ratios columns to
+        self.tasks_df (see self.get_tasks_df).
         
         If direction is "backward":
-        Convert self.time_df columns elements from tuples 
-        to strings.
+        Restore self.time_df tasks and ratios columns
+        (strings) from self.tasks_df.
         
         Incorrect derection raise ValueError.
         '''
+        import pandas as pd
         if direction == 'forward':
             self.time_df.date = pd.to_datetime(self.time_df.date)
             self.time_df = self.time_df.set_index('date')
             self.time_df = self.time_df.asfreq('1d').fillna(
                 value={'tasks':'0', 'ratios':'1.0', 'total':0})
-
-            #tasks column to tuples
-            column_list = []
-
-            for string in self.time_df.tasks:
-                tuple_of_codes = tuple(string.split())
-                column_list.append(tuple_of_codes)
-
-            self.time_df.tasks = column_list
-
-            #ratios column to tuples
-            column_list = []
-
-            for string in self.time_df.ratios:
-                tuple_of_ratios = tuple(map(float, string.split()))
-                column_list.append(tuple_of_ratios)
-
-            self.time_df.ratios = column_list
+            self.tasks_df = self.compact_tasks_df(
+                self.get_tasks_df(self.time_df))
+            self.time_df = self.time_df.drop(columns=['tasks', 'ratios'])
             
         elif direction == 'backward':
-            
-            #tasks column to strings
-            column_list = []
+            self.time_df = self.get_raw_time_df(self.time_df, self.tasks_df)
+            del self.tasks_df
+                
+        else:
+            raise ValueError
 
-            for tuple_of_codes in self.time_df.tasks:
-                string = ' '.join(tuple_of_codes)
-                column_list.append(string)
 
-            self.time_df.tasks = column_list
+    @staticmethod
+    def get_tasks_df(time_df):
+        '''
+        Return long format pandas.DataFrame of tasks of time_df
+        (raw tasks and ratios columns, datetime index).
+        One row for each task of each day, columns are
+        "code", "ratio" and "hours" (ratio * total).
+        Index is date of time_df.
+        Columns are split once as flat strings, rows of days
+        are repeated by numbers of their tasks.
+        Raise ValueError if numbers of tasks and ratios
+        of some day differ.
+        '''
+        import numpy as np
+        import pandas as pd
+        codes = ' '.join(time_df.tasks).split()
+        ratios = np.array(' '.join(time_df.ratios).split(), dtype=float)
+        counts = time_df.tasks.str.count(' ').values + 1
+        ratio_counts = time_df.ratios.str.count(' ').values + 1
+        if len(codes) != counts.sum() or len(ratios) != ratio_counts.sum():
+            #values are separated by several spaces
+            counts = time_df.tasks.str.split().str.len().values
+            ratio_counts = time_df.ratios.str.split().str.len().values
+        wrong = counts != ratio_counts
+        if wrong.any():
+            raise ValueError('Numbers of tasks and ratios differ at {}'.format(
+                time_df.index[wrong.argmax()]))
+        return pd.DataFrame(
+            {'code': codes, 'ratio': ratios,
+             'hours': ratios * np.repeat(time_df.total.values, counts)},
+            index=time_df.index.repeat(counts))
 
-            #ratios column to strings
-            column_list = []
+    def compact_tasks_df(self, tasks_df, categories=()):
+        '''
+        Return tasks_df (see self.get_tasks_df) with compact dtypes:
+        "code" is categorical (integer id of code is its position
+        in categories, then in self.codes_df, codes missing in
+        both are added after them), "ratio" and "hours" are float32.
+        categories is list of codes (e.g. categories of loaded
+        self.tasks_df to keep their ids).
+        '''
+        import numpy as np
+        import pandas as pd
+        categories = pd.Index(list(categories), dtype=object).append(
+            [pd.Index(self.codes_df.code, dtype=object),
+             pd.Index(tasks_df.code.unique(), dtype=object)]).unique()
+        return tasks_df.astype({'code': pd.CategoricalDtype(categories),
+                                'ratio': np.float32,
+                                'hours': np.float32})
 
-            for tuple_of_ratios in self.time_df.ratios:
-                string = ' '.join(map(str, tuple_of_ratios))
-                column_list.append(string)
 
-            self.time_df.ratios = column_list
-                
-        else:
-            raise ValueError
+    @staticmethod
+    def get_raw_time_df(time_df, tasks_df):
+        '''
+        Return pandas.DataFrame with tasks and ratios columns
+        (strings like in time.csv) restored from tasks_df
+        (see self.get_tasks_df) and columns of time_df.
+        Strings of rows of same day are joined by one
+        numpy.add.reduceat over rows sorted by date.
+        '''
+        import numpy as np
+        import pandas as pd
+        order = np.argsort(tasks_df.index.values, kind='stable')
+        dates = tasks_df.index.values[order]
+        first = np.ones(len(dates), dtype=bool)
+        first[1:] = dates[1:] != dates[:-1]
+        starts = np.flatnonzero(first)
+        index = pd.DatetimeIndex(dates[starts], name='date')
+        columns = []
+        for name, values in (('tasks', tasks_df.code.astype(object)),
+                             ('ratios', tasks_df.ratio.astype(str))):
+            joined = np.add.reduceat(values.values[order] + ' ', starts)
+            columns.append(pd.Series(joined, index=index,
+                                     name=name).str[:-1])
+        return pd.concat(columns + [time_df], axis=1)
 
 
-    def get_mean_time(self, period='full'):
+    def get_mean_time(self, period='full', start=None, end=None):
         '''
         Return mean value of self.time_df.total.
 
         period: str (values: "full", "year", "month", "week")
         time interval of calculation. Incorrect input raise ValueError;
 
+        start, end: str ("%Y-%m-%d") or datetime - explicit
+        dates of time interval (used instead of period if given).
+
         Need preprocessed self.time_df in call moment!
         '''
-        if period == 'full':
-            date = self.time_df.total.index[0].strftime('%Y-%m-%d')
-        elif period == 'year':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=365)).strftime('%Y-%m-%d')
-        elif period == 'month':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=30)).strftime('%Y-%m-%d')
-        elif period == 'week':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=7)).strftime('%Y-%m-%d')
-        else:
-            raise ValueError
+        if start is None:
+            if period == 'full':
+                pass
+            elif period == 'year':
+                start = (dt.datetime.today() - 
+                         dt.timedelta(days=365)).strftime('%Y-%m-%d')
+            elif period == 'month':
+                start = (dt.datetime.today() - 
+                         dt.timedelta(days=30)).strftime('%Y-%m-%d')
+            elif period == 'week':
+                start = (dt.datetime.today() - 
+                         dt.timedelta(days=7)).strftime('%Y-%m-%d')
+            else:
+                raise ValueError
         
-        series = self.time_df.total[date:]
-        return series.mean()
+        time, days = self.get_range_time(start, end)
+        return time / days if days else float('nan')
+
+    def get_week_time(self, code=None):
+        '''
+        Count work time for last week of self.time_df
+        (time of task with code and its subcodes if code is given)
+        by weekly rollup (see Rollup).
+        Return tuple of time and number of days of week.
+        '''
+        if self.is_pushdown():
+            last_date = self.query_last_date()
+            week_day = dt.datetime.isoweekday(last_date)
+            time, _ = self.query_range_time(
+                last_date - dt.timedelta(days=week_day - 1), last_date,
+                code=code, subtree=True)
+            return time, week_day
+        last_date = self.time_df.index[-1]
+        week_day = dt.datetime.isoweekday(last_date)
+        rollup = self.get_rollup('W')
+        key = (last_date.to_period('W'), code or '')
+        time = float(rollup.time[key]) if key in rollup.index else 0.0
+        return time, week_day
+
+    def is_pushdown(self):
+        '''
+        Return True if queries should be run by database
+        (sqlite storage and data is not loaded yet).
+        '''
+        return self.storage == 'sqlite' and 'tasks_df' not in self.__dict__
+
+    def get_prefix_sums(self, code=None, subtree=False):
+        '''
+        Return tuple of numpy arrays of cumulative sums of hours
+        and of days with work (both starts with 0) for days of
+        self.time_df index.
+        code is str (task code) or None (total time).
+        subtree: count time of subcodes of code too.
+
+        Arrays are cached until data is changed
+        (see self.dataVersion).
+        '''
+        import numpy as np
+        if getattr(self, 'prefixVersion', None) != self.dataVersion:
+            self.prefix_sums = {}
+            self.prefixVersion = self.dataVersion
+        key = (code, subtree and code is not None)
+        if key not in self.prefix_sums:
+            length = len(self.time_df)
+            if code is None:
+                hours = self.time_df.total.values
+                days = np.ones(length)
+            else:
+                if key[1]:
+                    series = self.tasks_df.hours[self.tasks_df.code.isin(
+                        self.get_subcodes(code))]
+                else:
+                    series = self.get_task_time_series(code)
+                idx = (series.index - self.time_df.index[0]).days
+                hours = np.bincount(idx, weights=series.values,
+                                    minlength=length)
+                days = np.bincount(idx, minlength=length) > 0
+            self.prefix_sums[key] = (
+                np.concatenate(([0], np.cumsum(hours))),
+                np.concatenate(([0], np.cumsum(days))))
+        return self.prefix_sums[key]
+
+    def get_range_time(self, start=None, end=None, code=None,
+                       subtree=False):
+        '''
+        Return tuple of sum of hours and number of days with work
+        between dates start and end (inclusive) by O(1) lookup
+        in self.get_prefix_sums arrays (or by SQL query if data
+        is not loaded, see self.is_pushdown).
+
+        start, end: str ("%Y-%m-%d") or datetime. None for first
+        and last dates of self.time_df.
+        code: str (task code) or None (total time, every day
+        of interval is counted).
+        subtree: count time of subcodes of code too.
+        Incorrect dates raise ValueError.
+        '''
+        import pandas as pd
+        if self.is_pushdown():
+            return self.query_range_time(start, end, code, subtree)
+        hours, days = self.get_prefix_sums(code, subtree)
+        first = self.time_df.index[0]
+        length = len(hours) - 1
+        lo, hi = 0, length
+        if start is not None:
+            lo = min(max((pd.Timestamp(start) - first).days, 0), length)
+        if end is not None:
+            hi = min(max((pd.Timestamp(end) - first).days + 1, lo), length)
+        return float(hours[hi] - hours[lo]), int(days[hi] - days[lo])
 
-        
     def get_task_time_series(self, code):
         '''
-        Search rows in self.time_df by code.
+        Search rows in self.tasks_df by code.
         
         time_df must be preprocessed.
         
         Return pandas.Series of weighted task 
         time values with this code.
         Series have datetime index.
+
+        Last seriesCacheSize series are cached until data is
+        changed (see self.dataVersion). Returned series must
+        not be modified.
         '''
-        mask = self.time_df.tasks.apply(lambda x: code in x)
-        task_df = self.time_df[mask]
-        idx_series = task_df.tasks.apply(lambda x: x.index(code))
-        time_list = []
-        for idx, ratios, time in zip(idx_series, 
-                                     task_df.ratios, 
-                                     task_df.total):
-            time_list.append(ratios[idx]*time)
-        task_df.insert(loc=0, column='time', value=time_list)
-        return task_df.time
+        if getattr(self, 'seriesVersion', None) != self.dataVersion:
+            self.series_cache = OrderedDict()
+            self.seriesVersion = self.dataVersion
+        if code in self.series_cache:
+            self.series_cache.move_to_end(code)
+            return self.series_cache[code]
 
+        series = self.tasks_df.hours[self.tasks_df.code == code]
+        series = series.rename('time')
+        self.series_cache[code] = series
+        if len(self.series_cache) > self.seriesCacheSize:
+            self.series_cache.popitem(last=False)
+        return series
 
-    @staticmethod
-    def get_subcodes(code, codes, with_self=True):
+    def get_tasks_time_matrix(self, codes):
+        '''
+        Return pandas.DataFrame of task time of codes (list of
+        codes) by one pass over self.tasks_df: index is every day
+        from first to last day of selected codes, columns are
+        codes. Days before first and after last day of code are
+        NaN, other days without time are 0 (the same values
+        as get_task_time_series(code).asfreq('1d', fill_value=0)).
+        '''
+        tasks_df = self.tasks_df[self.tasks_df.code.isin(codes)]
+        grouped = tasks_df.hours.groupby(
+            [tasks_df.index, tasks_df.code.astype(object)])
+        matrix = grouped.sum().unstack().reindex(columns=codes)
+        matrix = matrix.asfreq('1D')
+        return matrix.fillna(0).where(matrix.ffill().notna() & 
+                                      matrix.bfill().notna())
+
+
+    def set_code_tree(self):
         '''
-        Return list of subcodes of selected code from codes.
-        Need re.
+        Set code_tree self attribute (CodeTree of
+        self.codes_df.code).
         '''
-        if with_self:
-            return [i for i in codes if re.match(code, i)]
-        return [i for i in codes if re.match(code+'_', i)]
+        self.code_tree = CodeTree(self.codes_df.code)
+
+    def get_subcodes(self, code, with_self=True):
+        '''
+        Return list of subcodes of selected code
+        (see self.code_tree).
+        '''
+        return self.code_tree.descendants(code, with_self=with_self)
 
     def get_end_codes(self):
         '''Return bool list of end values of codes tree'''
-        return [len(self.get_subcodes(i, self.summary_df.code,
-                                      with_self=False))==0
-                for i in self.summary_df.code]
+        return [self.code_tree.is_leaf(i) for i in self.summary_df.code]
 
     
     @staticmethod
@@ -178,6 +509,7 @@ class DataProcessor():
         time_series is Pandas.Series
         weight is number or Pandas.Series with same length
         '''
+        import numpy as np
         time_series.loc[time_series == 0] = 0.001
         ans = (10 - np.log(time_series))*1.5*weight
         ans[ans < 0] = 0
@@ -190,46 +522,110 @@ class DataProcessor():
         summary_df is pandas.DataFrame based on self.codes_df.
         Raise error if self.codes_df not found (!).
         '''
-        self.summary_df = self.codes_df.copy()
+        import numpy as np
+        self.set_code_tree()
+        self.summary_df = self.codes_df.astype({'task': 'category',
+                                                'code': 'category'})
 
         #calculation of "self_time", "self_days" columns
-        time_list, days_list = [], []
-
-        for code in self.summary_df.code:
-            time_series = self.get_task_time_series(code)
-            time_list.append(time_series.sum())
-            days_list.append(time_series.count())
-
-        self.summary_df['self_time'] = np.round(time_list,
-                                                self.roundPlaces)
-        self.summary_df['self_days'] = np.round(days_list,
+        grouped = self.tasks_df.groupby('code', observed=True).hours
+        self_time = self.summary_df.code.map(
+            grouped.sum().astype(float)).astype(float).fillna(0)
+        self_days = self.summary_df.code.map(
+            grouped.count()).astype(float).fillna(0)
+        self.summary_df['self_time'] = np.round(self_time,
                                                 self.roundPlaces)
+        self.summary_df['self_days'] = self_days.astype(int)
 
         #calculation of "total_time", "total_days" columns
-        time_list, days_list = [], []
-
-        for code in self.summary_df.code:
-            subcodes = self.get_subcodes(code, self.summary_df.code)
-            mask = self.summary_df.code.apply(lambda code:
-                                              code in subcodes)
-            total_time = self.summary_df[mask].self_time.sum()
-            total_days = self.summary_df[mask].self_days.sum()
-            time_list.append(total_time)
-            days_list.append(total_days)
-
-        self.summary_df['total_time'] = np.round(time_list,
-                                                 self.roundPlaces)
-        self.summary_df['total_days'] = np.round(days_list,
-                                                 self.roundPlaces)
-
-        #calculation of "per_day", "rang" columns
-        per_day = self.summary_df.total_time / self.summary_df.total_days
-        rang = self.get_rang(self.summary_df.total_time,
-                             self.summary_df.priority)
-        self.summary_df['per_day'] = np.round(per_day, self.roundPlaces)
-        self.summary_df['rang'] = np.round(rang, self.roundPlaces)
+        #(bottom-up propagation from leaves to root)
+        total_time = dict(zip(self.summary_df.code,
+                              self.summary_df.self_time))
+        total_days = dict(zip(self.summary_df.code,
+                              self.summary_df.self_days))
+
+        for code in self.code_tree.bottom_up():
+            parent = self.code_tree.parent(code)
+            if parent is not None:
+                total_time[parent] += total_time[code]
+                total_days[parent] += total_days[code]
+
+        self.summary_df['total_time'] = np.round(
+            self.summary_df.code.map(total_time).astype(float),
+            self.roundPlaces)
+        self.summary_df['total_days'] = self.summary_df.code.map(
+            total_days).astype(int)
+
+        self.summary_idx = dict(zip(self.summary_df.code,
+                                    self.summary_df.index))
+        self.upd_summary_rang()
 
         
+    def upd_summary_rang(self, rows=None):
+        '''
+        Calculate "per_day", "rang" columns of self.summary_df
+        for rows (list of index values, all rows if None).
+        '''
+        import numpy as np
+        if rows is None:
+            rows = self.summary_df.index
+        summary_df = self.summary_df.loc[rows]
+        per_day = summary_df.total_time / summary_df.total_days
+        rang = self.get_rang(summary_df.total_time.copy(),
+                             summary_df.priority)
+        self.summary_df.loc[rows, 'per_day'] = np.round(per_day,
+                                                        self.roundPlaces)
+        self.summary_df.loc[rows, 'rang'] = np.round(rang,
+                                                     self.roundPlaces)
+
+    def upd_summary_df(self, code, time=0, days=0):
+        '''
+        Add time and days of task with code to self.summary_df
+        row of code and rows of its ancestors (without full
+        recalculation of self.summary_df).
+        '''
+        import numpy as np
+        if code not in self.summary_idx:
+            return
+        rows = [self.summary_idx[code]] + \
+               [self.summary_idx[i] for i in self.code_tree.ancestors(code)]
+        self.summary_df.loc[rows[0], 'self_time'] = round(
+            self.summary_df.loc[rows[0], 'self_time'] + time,
+            self.roundPlaces)
+        self.summary_df.loc[rows[0], 'self_days'] += days
+        self.summary_df.loc[rows, 'total_time'] = np.round(
+            self.summary_df.loc[rows, 'total_time'] + time,
+            self.roundPlaces)
+        self.summary_df.loc[rows, 'total_days'] += days
+        self.upd_summary_rang(rows)
+
+    def add_summary_row(self, task, code, priority):
+        '''
+        Add row of new task to self.summary_df and self.code_tree.
+        Existing subcodes of code are counted in its totals.
+        '''
+        idx = self.summary_df.index.max() + 1
+        if code in self.summary_idx:
+            row = self.summary_df.loc[self.summary_idx[code]].to_dict()
+        else:
+            self.code_tree.add(code)
+            childs = [self.summary_idx[i]
+                      for i in self.code_tree.children(code)]
+            row = {'self_time': 0, 'self_days': 0,
+                   'total_time': round(
+                       self.summary_df.loc[childs, 'total_time'].sum(),
+                       self.roundPlaces),
+                   'total_days': self.summary_df.loc[childs,
+                                                     'total_days'].sum()}
+        row.update(task=task, code=code, priority=priority)
+        self.summary_df.loc[idx] = row
+        #new row makes object columns of categorical ones
+        self.summary_df = self.summary_df.astype({'task': 'category',
+                                                  'code': 'category'})
+        self.summary_idx[code] = idx
+        self.upd_summary_rang([idx])
+
+
     def get_code_by_name(self, name):
         '''Search code of task by name. Return code or None.
         name is str'''
@@ -280,100 +676,457 @@ class DataProcessor():
         else:
             raise ValueError
 
+    def drop_data_row(self, df='time_df'):
+        '''
+        Drop last row of time data or codes.csv
+        (df is "time_df" or "codes_df") from selected storage
+        and reload data. Incorrect df raise ValueError.
+        '''
+        import pandas as pd
+        self.flush_data()
+        if self.storage == 'sqlite':
+            self.drop_sqlite_row(df=df)
+        elif df == 'time_df' and self.storage == 'mmap':
+            self.drop_mmap_day()
+        elif df == 'time_df':
+            self.load_data(preprocessing=False)
+            self.drop_last_row(df=df)
+            self.save_data(preprocessing=False)
+        elif df == 'codes_df':
+            size = self.get_files_size(['codes.csv'])
+            codes_df = pd.read_csv(self.path + 'codes.csv')[:-1]
+            codes_df.to_csv(self.path + 'codes.csv', index=False)
+            self.count_io(rows_read=len(codes_df) + 1, bytes_read=size,
+                          rows_written=len(codes_df),
+                          bytes_written=self.get_files_size(['codes.csv']))
+        else:
+            raise ValueError
+        self.load_data(preprocessing=True)
+
         
+    def read_last_row(self, filename='time.csv'):
+        '''
+        Read last non-empty line of file without reading whole file.
+        Return tuple of offset (int, position of line start) and
+        line (str without line break).
+        '''
+        with open(self.path + filename, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            end = file.tell()
+            while end and self._last_byte(file, end) in b'\r\n':
+                end -= 1
+            offset = end
+            chunk = b''
+            while offset:
+                step = min(self.tailChunk, offset)
+                offset -= step
+                file.seek(offset)
+                chunk = file.read(step) + chunk
+                idx = chunk.rfind(b'\n', 0, end - offset)
+                if idx != -1:
+                    offset += idx + 1
+                    break
+            file.seek(offset)
+            line = file.read(end - offset)
+        self.count_io(rows_read=1, bytes_read=len(chunk) + len(line))
+        return offset, line.decode()
+
+    @staticmethod
+    def _last_byte(file, end):
+        file.seek(end - 1)
+        return file.read(1)
+
+    def write_rows(self, rows, filename='time.csv', offset=None):
+        '''
+        Write rows (iterable of str) to the end of file.
+        If offset is given, file is truncated to offset before
+        writing (used to replace last row, see self.read_last_row).
+        '''
+        data = ''.join(row + '\n' for row in rows).encode()
+        with open(self.path + filename, 'r+b') as file:
+            if offset is None:
+                file.seek(0, os.SEEK_END)
+                if file.tell() and self._last_byte(file,
+                                                   file.tell()) != b'\n':
+                    file.write(b'\n')
+            else:
+                file.seek(offset)
+                file.truncate()
+            file.write(data)
+        self.count_io(rows_written=data.count(b'\n'),
+                      bytes_written=len(data))
+
+    def merge_task_time(self, row, code, time):
+        '''
+        Add time of task with code to row of time.csv.
+
+        row is tuple of date, tasks, ratios (strings) and total
+        (float) or None for new row.
+        Return tuple of new row's tasks, ratios (strings) and total.
+        '''
+        if row is None:
+            return (code, '1.0', time)
+
+        _, last_tasks, last_ratios, last_total = row
+        last_tasks = last_tasks.split()
+        weighted_time = [last_total * ratio for
+                         ratio in map(float, last_ratios.split())]
+
+        if code in last_tasks:
+            idx = last_tasks.index(code)
+            weighted_time[idx] += time
+        else:
+            weighted_time.append(time)
+            last_tasks.append(code)
+        total = round(sum(weighted_time), self.roundPlaces)
+        ratios = ' '.join([str(round(time/total, self.roundPlaces))
+                           for time in weighted_time])
+        return (' '.join(last_tasks), ratios, total)
+
+    def get_day_row(self, date):
+        '''
+        Return tuple of date, tasks, ratios (strings) and total
+        (float) of day from loaded data or None if there is
+        no row for date (or day without work filled
+        in preprocessing).
+        date is pandas.Timestamp
+        '''
+        if date not in self.time_df.index or \
+           self.time_df.total[date] == 0:
+            return None
+        day_df = self.tasks_df.loc[[date]]
+        return (date.strftime('%Y-%m-%d'),
+                ' '.join(day_df.code),
+                ' '.join(day_df.ratio.astype(str)),
+                float(self.time_df.total[date]))
+
+    def set_day_row(self, date, tasks, ratios, total):
+        '''
+        Replace or add day row in loaded data (self.time_df and
+        self.tasks_df) like it was read from time.csv.
+        Missing days before date are filled like in
+        self.time_df_preprocessing.
+        Return number of filled days.
+        '''
+        import pandas as pd
+        if date in self.time_df.index:
+            days = pd.DatetimeIndex([date], name='date')
+        elif len(self.time_df):
+            days = pd.date_range(self.time_df.index[-1], date,
+                                 name='date')[1:]
+        else:
+            days = pd.DatetimeIndex([date], name='date')
+        day_df = pd.DataFrame({'tasks': '0', 'ratios': '1.0',
+                               'total': 0.0}, index=days)
+        day_df.iloc[-1] = (tasks, ratios, total)
+
+        #new codes are added to categories of self.tasks_df
+        day_tasks = self.compact_tasks_df(
+            self.get_tasks_df(day_df), self.tasks_df.code.cat.categories)
+        tasks_df = self.tasks_df.astype({'code': day_tasks.code.dtype})
+        if date in self.time_df.index:
+            self.time_df.loc[date, 'total'] = total
+            self.tasks_df = pd.concat([tasks_df[tasks_df.index != date],
+                                       day_tasks])
+        else:
+            self.time_df = pd.concat([self.time_df, day_df[['total']]])
+            self.tasks_df = pd.concat([tasks_df, day_tasks])
+        self.upd_rollups(days)
+        self.dataVersion += 1
+        return len(days) - 1
+
     def upd_time_df(self, task, time):
         '''
-        Load data without time_df preprocessing,
-        add or replace last row of self.time_df and
-        save data without time_df preprocessing.
+        Add time to today row of loaded data.
+        Rows of self.summary_df are updated by self.upd_summary_df.
+        Row is written to storage when number of pending entries
+        reaches flushSize (see self.get_pending_size).
         
         Need datetime as dt (using today date).
         
-        path, task (see self.check_task) and time are strings.
+        task (see self.check_task) and time are strings.
         time is string representation of float.
 
         Return tuple of new row's data
         '''
-        code = self.check_task(task)
-        time = float(time)
-        date = dt.datetime.today().strftime('%Y-%m-%d')
+        return self.upd_time_df_many([(task, time)])
 
-        self.load_data(preprocessing=False)
+    def upd_time_df_many(self, entries, checked=False):
+        '''
+        Batch version of self.upd_time_df.
+        All entries are added to today row by one update.
 
-        last_row = self.time_df.iloc[-1]
+        entries is iterable of tuples (task, time).
+        checked: tasks of entries are codes (not checked by
+        self.check_task, e.g. code of TimeCounter session).
 
-        #preprocessing to update existing row
-        if date == last_row.date:
+        Return tuple of new row's data
+        '''
+        import pandas as pd
+        entries = [(task if checked else self.check_task(task), float(time))
+                   for task, time in entries]
+        date = pd.Timestamp(dt.date.today())
+
+        row = self.get_day_row(date)
+        if row is None:
+            action = 'added'
+            day_codes = set()
+        else:
             action = 'updated'
-            last_row_ratios = map(float, last_row.ratios.split())
-            last_row_tasks = last_row.tasks.split()
-            weighted_time = [last_row.total * ratio for 
-                             ratio in last_row_ratios]
+            day_codes = set(row[1].split())
 
-            if code in last_row_tasks:
-                idx = last_row_tasks.index(code)
-                weighted_time[idx] += time
-                tasks = ' '.join(last_row_tasks)
+        for code, time in entries:
+            row = (date.strftime('%Y-%m-%d'),) + \
+                  self.merge_task_time(row, code, time)
+            self.upd_summary_df(code, time, days=int(code not in day_codes))
+            day_codes.add(code)
 
+        self.upd_summary_df('0', days=self.set_day_row(date, *row[1:]))
+        self.pendingRows[row[0]] = ','.join(map(str, row))
+        self.pendingEntries += [(row[0], code, time)
+                                for code, time in entries]
+        if self.get_pending_size() >= self.flushSize:
+            self.flush_data()
+        return row + (action,)
+
+    def get_pending_size(self):
+        '''
+        Return number of not flushed entries (/add entries
+        and codes rows). Data is flushed when it reaches
+        flushSize (1 - every change is written at once,
+        batch and server modes write changes by groups).
+        '''
+        return len(self.pendingEntries) + len(self.pendingCodes)
+
+    def flush_data(self):
+        '''
+        Write pending rows of time data and codes.csv to files.
+        Pending last row of time.csv replaces its last line
+        if they have same date, time.csv is rewritten if pending
+        row is before its last line (for mmap storage rows are written
+        in place, see MmapStorage.write_mmap_days, for sqlite
+        storage all rows are written by one transaction, see
+        SqliteStorage.write_sqlite_days).
+        Snapshot is not written (its key does not match changed
+        files), it is saved again at exit (see self.close_session).
+        '''
+        if not (self.pendingRows or self.pendingCodes):
+            return
+        if self.storage == 'sqlite':
+            self.write_sqlite_days(self.pendingEntries,
+                                   len(self.pendingCodes))
+            self.pendingCodes.clear()
+            self.pendingRows.clear()
+            self.pendingEntries.clear()
+        if self.pendingCodes:
+            self.write_rows(self.pendingCodes, 'codes.csv')
+            self.pendingCodes.clear()
+        if self.pendingRows and self.storage == 'mmap':
+            self.write_mmap_days(list(self.pendingRows))
+        elif self.pendingRows:
+            offset, line = self.read_last_row('time.csv')
+            last = line.split(',')[0]
+            if last not in self.pendingRows:
+                offset = None
+            if last != 'date' and min(self.pendingRows) < last:
+                #pending day is not the last day of file
+                self.get_raw_time_df(self.time_df, self.tasks_df).to_csv(
+                    self.path + 'time.csv', index_label='date')
+                self.count_io(rows_written=len(self.time_df),
+                              bytes_written=self.get_files_size(
+                                  ['time.csv']))
             else:
-                weighted_time.append(time)
-                tasks = last_row.tasks + ' ' + code
-            total = round(sum(weighted_time), self.roundPlaces)
-            ratios = ' '.join([str(round(time/total,
-                                         self.roundPlaces)) for
-                               time in weighted_time])
-            self.drop_last_row(df='time_df')
-
-        #preprocessing to add new row
-        else:
-            action = 'added'
-            total = time
-            ratios = '1.0'
-            tasks = code
-            
-        self.time_df.loc[self.time_df.shape[0]] = (date,
-                                                   tasks,
-                                                   ratios,
-                                                   total)
-        self.save_data(preprocessing=False)
-        return (date, tasks, ratios, total, action)
+                self.write_rows(self.pendingRows.values(),
+                                'time.csv', offset)
+        self.pendingRows.clear()
+        self.pendingEntries.clear()
+        self.snapshotStale = True
+
+
+    @staticmethod
+    def read_sessions(filename, chunksize):
+        '''
+        Return iterator of pandas.DataFrame chunks of session log
+        (.csv or .jsonl file with "timestamp", "task" and "minutes"
+        columns/keys).
+        '''
+        import pandas as pd
+        if filename.endswith(('.jsonl', '.json')):
+            return pd.read_json(filename, lines=True, chunksize=chunksize)
+        return pd.read_csv(filename, chunksize=chunksize)
+
+    def import_sessions(self, filename, chunksize=100000):
+        '''
+        Import session log of other tracker (see self.read_sessions)
+        to time.csv. File is read by chunks, tasks are checked by
+        self.check_task (incorrect task or session after today
+        raise ValueError before any change), time of sessions
+        is summed by days and merged
+        to existing rows. Time data is written to storage once
+        (see self.write_data).
+
+        Return tuple of number of imported sessions and days.
+        '''
+        import pandas as pd
+        codes = {}
+        hours = None
+        sessions = 0
+        for chunk in self.read_sessions(filename, chunksize):
+            for task in chunk.task.unique():
+                if task not in codes:
+                    codes[task] = self.check_task(str(task).lower())
+            dates = pd.to_datetime(chunk.timestamp)
+            if dates.dt.tz is not None:
+                dates = dates.dt.tz_localize(None)
+            if (dates >= pd.Timestamp(dt.date.today() +
+                                      dt.timedelta(days=1))).any():
+                raise ValueError('Session after today: {}'.format(
+                    dates.max()))
+            chunk_hours = (chunk.minutes / 60).groupby(
+                [dates.dt.normalize().rename('date'),
+                 chunk.task.map(codes).rename('code')]).sum()
+            hours = chunk_hours if hours is None else \
+                    hours.add(chunk_hours, fill_value=0)
+            sessions += len(chunk)
+        self.count_io(rows_read=sessions,
+                      bytes_read=os.path.getsize(filename))
+        if hours is None:
+            return (0, 0)
+
+        self.flush_data()
+        day_df = self.merge_day_hours(hours)
+        time_df = self.get_raw_time_df(self.time_df, self.tasks_df)
+        time_df = pd.concat([time_df[~time_df.index.isin(day_df.index)],
+                             day_df]).sort_index()
+        self.time_df = time_df.rename_axis('date').reset_index()
+        self.time_df_preprocessing(direction='forward')
+        self.write_data()
+        self.set_summary_df()
+        self.dataVersion += 1
+        self.snapshotStale = True
+        return (sessions, len(day_df))
+
+    def merge_day_hours(self, hours):
+        '''
+        Add hours to loaded days data.
+        hours is pandas.Series of task time with (date, code)
+        index.
+        Return pandas.DataFrame of changed days (date index,
+        tasks, ratios and total columns like in time.csv).
+        '''
+        import pandas as pd
+        days = hours.index.get_level_values('date').unique()
+        day_tasks = self.tasks_df[self.tasks_df.index.isin(days)]
+        #skip rows of days without work (filled in preprocessing)
+        day_tasks = day_tasks[
+            self.time_df.total.reindex(day_tasks.index).values != 0]
+        day_tasks = day_tasks.astype({'code': object, 'hours': float})
+        day_tasks = day_tasks.set_index('code', append=True).hours
+        hours = pd.concat([day_tasks, hours]).groupby(
+            level=['date', 'code'], sort=False).sum()
+
+        total = hours.groupby(level='date', sort=False).sum()
+        total = total.round(self.roundPlaces)
+        ratios = (hours / total.reindex(
+            hours.index.get_level_values('date')).values)
+        ratios = ratios.round(self.roundPlaces).astype(str)
+        codes = hours.index.get_level_values('code').to_series(
+            index=hours.index)
+        return pd.DataFrame({
+            'tasks': codes.groupby(level='date', sort=False).agg(' '.join),
+            'ratios': ratios.groupby(level='date', sort=False).agg(' '.join),
+            'total': total})
 
 
     def upd_codes_df(self, task, code, priority):
         '''
-        Load data without time_df preprocessing,
-        add row to self.codes_df and
-        save data without time_df preprocessing.
+        Add row to loaded self.codes_df and self.summary_df.
+        Row is written to codes.csv when number of pending
+        entries reaches flushSize (see self.get_pending_size).
         
-        path, task, code, priority are strings.
+        task, code, priority are strings.
         priority is string representation of float.
         
         Be careful with input. Checking only priority.
         '''
 
         priority = float(priority)
-
-        self.load_data(preprocessing=False)
-        self.codes_df.loc[self.codes_df.shape[0]] = (task,
-                                                     code,
-                                                     priority)
-        self.save_data(preprocessing=False)
+        self.codes_df.loc[len(self.codes_df)] = (task, code, priority)
+        self.add_summary_row(task, code, priority)
+        self.dataVersion += 1
+        self.pendingCodes.append(','.join((task, code, str(priority))))
+        if self.get_pending_size() >= self.flushSize:
+            self.flush_data()
 
     
     def normalize(self, series):
         return series/series.sum()
 
-            
-    def make_recommendation(self):
+    def get_alias_table(self):
+        '''
+        Return tuple of numpy arrays of end tasks names, weights
+        (rang), probabilities and aliases of Walker alias table
+        (Vose method) for O(1) random choice of task with respect
+        to rang (see self.draw_tasks).
+        Table is cached until data is changed (see self.dataVersion).
+        '''
+        import numpy as np
+        if getattr(self, 'aliasVersion', None) != self.dataVersion:
+            leaves = self.summary_df[self.get_end_codes()]
+            weights = leaves.rang.values.astype(float)
+            prob = self.normalize(weights) * len(weights)
+            alias = np.arange(len(weights))
+            small = list(np.flatnonzero(prob < 1))
+            large = list(np.flatnonzero(prob >= 1))
+            while small and large:
+                less, more = small.pop(), large.pop()
+                alias[less] = more
+                prob[more] -= 1 - prob[less]
+                if prob[more] < 1:
+                    small.append(more)
+                else:
+                    large.append(more)
+            #rest of probabilities differs from 1 by rounding errors
+            prob[small + large] = 1
+            self.alias_table = (leaves.task.values, weights, prob, alias)
+            self.aliasVersion = self.dataVersion
+        return self.alias_table
+
+    def draw_tasks(self, size):
+        '''
+        Return numpy array of size indexes of tasks of
+        self.get_alias_table drawn with respect to rang.
+        '''
+        import numpy as np
+        _, _, prob, alias = self.get_alias_table()
+        idx = np.random.randint(len(prob), size=size)
+        return np.where(np.random.random(size) < prob[idx],
+                        idx, alias[idx])
+
+    def make_recommendation(self, size=None):
         '''
         Return random string of task name from self.summary_df
         with respect to tasks rangs.
-        
+        If size (int) is given, return list of size different
+        task names (or all tasks with rang > 0 if there are less).
+
         Need numpy as np
         '''
-        predict_base = self.summary_df[self.get_end_codes()
-                                       ].loc[:,['task', 'rang']]
-        predict_base.rang = self.normalize(predict_base.rang)
-        return np.random.choice(predict_base.task, size=1,
-                         replace=False, p=predict_base.rang)[0]
+        import numpy as np
+        tasks, weights, _, _ = self.get_alias_table()
+        if size is None:
+            return tasks[self.draw_tasks(1)[0]]
 
+        size = min(size, np.count_nonzero(weights))
+        ans = {}
+        for _ in range(self.recommendRounds):
+            for idx in self.draw_tasks(2 * size):
+                ans.setdefault(idx, None)
+            if len(ans) >= size:
+                return [tasks[i] for i in list(ans)[:size]]
+        #rare tasks are drawn without alias table
+        rest = np.setdiff1d(np.flatnonzero(weights), list(ans))
+        ans = list(ans) + list(np.random.choice(
+            rest, size=size - len(ans), replace=False,
+            p=self.normalize(weights[rest])))
+        return [tasks[i] for i in ans]
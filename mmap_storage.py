@@ -0,0 +1,202 @@
+import json
+import os
+
+
+class MmapStorage():
+    '''
+    impurity class for storing time data as memory-mapped float32
+    matrix of days x codes (binary file mmapFile) instead of
+    time.csv. Column 0 contains total time of day, other columns
+    contain time of tasks (0 hours of task of day with work are
+    stored as -0.0 to differ from missing task). Metadata file
+    mmapMetaFile (json) contains first date, number of days,
+    matrix capacity and width and codes of task columns (in order
+    of codes.csv, new codes are appended). codes.csv is stored
+    as usual.
+    Need json; os. numpy and pandas are imported by methods.
+    '''
+    mmapFile = 'time.bin'
+    mmapMetaFile = 'time.json'
+    mmapDaysStep = 366
+    mmapCodesStep = 64
+    mmapDecimals = 5
+
+    def read_mmap_meta(self):
+        with open(self.path + self.mmapMetaFile) as file:
+            return json.load(file)
+
+    def write_mmap_meta(self, meta):
+        meta['writes'] = meta.get('writes', 0) + 1
+        with open(self.path + self.mmapMetaFile, 'w') as file:
+            json.dump(meta, file)
+
+    def open_mmap(self, meta, mode='r', filename=None):
+        '''
+        Return numpy.memmap of matrix with shape from meta.
+        '''
+        import numpy as np
+        return np.memmap(filename or self.path + self.mmapFile,
+                         dtype=np.float32, mode=mode,
+                         shape=(meta['capacity'], meta['width']))
+
+    @staticmethod
+    def get_mmap_hours(hours, total):
+        '''
+        Return hours of tasks (numpy array) to write to matrix:
+        0 hours are replaced by -0.0 if total of day is not 0.
+        '''
+        import numpy as np
+        return np.where((hours == 0) & (total > 0), -0.0, hours)
+
+    @staticmethod
+    def get_mmap_mask(matrix):
+        '''Return bool array of stored values of matrix'''
+        import numpy as np
+        return (matrix != 0) | np.signbit(matrix)
+
+    def load_mmap(self):
+        '''
+        Set self.time_df and self.tasks_df (like after
+        self.time_df_preprocessing) from matrix and self.codes_df
+        from codes.csv.
+        If matrix file not exists, it is made from time.csv.
+        Matrix is read through read-only memory map, but its
+        stored values are copied to self.tasks_df (loaded data
+        is the same for all storages, no numpy views are kept).
+        '''
+        import numpy as np
+        import pandas as pd
+        if not os.path.exists(self.path + self.mmapMetaFile):
+            self.load_data(preprocessing=False)
+            self.time_df_preprocessing(direction='forward')
+            self.write_mmap()
+            return
+
+        self.codes_df = pd.read_csv(self.path + 'codes.csv')
+        meta = self.read_mmap_meta()
+        matrix = self.open_mmap(meta)[:meta['days']]
+        self.count_io(rows_read=meta['days'] + len(self.codes_df),
+                      bytes_read=matrix.nbytes +
+                      self.get_files_size(['codes.csv']))
+        dates = pd.date_range(meta['start'], periods=meta['days'],
+                              name='date')
+        total = np.round(matrix[:, 0].astype(np.float64),
+                         self.mmapDecimals)
+        rows, cols = np.nonzero(self.get_mmap_mask(matrix[:, 1:]))
+        hours = np.round(matrix[rows, cols + 1].astype(np.float64),
+                         self.mmapDecimals) + 0.0  #-0.0 to 0.0
+
+        #days without work are filled like in time_df preprocessing
+        empty = np.flatnonzero(total == 0)
+        codes = np.array(meta['codes'], dtype=object)
+        tasks_df = pd.DataFrame(
+            {'code': np.concatenate([codes[cols],
+                                     np.full(len(empty), '0', object)]),
+             'ratio': np.concatenate([hours / total[rows],
+                                      np.ones(len(empty))]),
+             'hours': np.concatenate([hours, np.zeros(len(empty))])},
+            index=dates[np.concatenate([rows, empty])])
+        self.tasks_df = self.compact_tasks_df(
+            tasks_df.sort_index(kind='stable'), meta['codes'])
+        self.time_df = pd.DataFrame({'total': total}, index=dates)
+
+    def get_mmap_codes(self, codes=()):
+        '''
+        Return list of codes of matrix columns: codes of
+        self.codes_df, codes (list of str) and codes of self.tasks_df
+        which are missing in self.codes_df.
+        '''
+        ans = list(dict.fromkeys(self.codes_df.code))
+        ans += [i for i in dict.fromkeys(codes) if i not in ans]
+        known = set(ans)
+        ans += [i for i in self.tasks_df.code.unique() if i not in known]
+        return ans
+
+    def write_mmap(self):
+        '''
+        Write loaded self.time_df and self.tasks_df to new matrix
+        file (replaces old one).
+        '''
+        import numpy as np
+        days = len(self.time_df)
+        codes = self.get_mmap_codes()
+        meta = {'start': self.time_df.index[0].strftime('%Y-%m-%d'),
+                'days': days,
+                'capacity': -(-days // self.mmapDaysStep) *
+                            self.mmapDaysStep,
+                'width': -(-(len(codes) + 1) // self.mmapCodesStep) *
+                         self.mmapCodesStep,
+                'codes': codes}
+        filename = self.path + self.mmapFile + '.tmp'
+        matrix = self.open_mmap(meta, mode='w+', filename=filename)
+        col = {code: idx for idx, code in enumerate(codes, 1)}
+        rows = (self.tasks_df.index - self.time_df.index[0]).days
+        matrix[rows, self.tasks_df.code.astype(object).map(col).values] = \
+            self.get_mmap_hours(self.tasks_df.hours.values,
+                                self.time_df.total.reindex(
+                                    self.tasks_df.index).values)
+        matrix[:days, 0] = self.time_df.total.values
+        matrix.flush()
+        self.count_io(rows_written=days, bytes_written=matrix.nbytes)
+        del matrix
+        os.replace(filename, self.path + self.mmapFile)
+        self.write_mmap_meta(meta)
+
+    def write_mmap_days(self, dates):
+        '''
+        Write days of loaded data to matrix in place.
+        dates is list of str ("%Y-%m-%d").
+        Matrix file is extended by mmapDaysStep rows if needed and
+        rewritten if there are new codes over its width.
+        '''
+        import pandas as pd
+        meta = self.read_mmap_meta()
+        dates = pd.DatetimeIndex(dates)
+        codes = self.get_mmap_codes(meta['codes'])
+        start = pd.Timestamp(meta['start'])
+        if len(codes) >= meta['width'] or dates.min() < start:
+            self.write_mmap()
+            return
+        meta['codes'] = codes
+
+        last = (dates.max() - start).days + 1
+        if last > meta['capacity']:
+            meta['capacity'] = -(-last // self.mmapDaysStep) * \
+                               self.mmapDaysStep
+            with open(self.path + self.mmapFile, 'r+b') as file:
+                file.truncate(meta['capacity'] * meta['width'] * 4)
+        meta['days'] = max(meta['days'], last)
+
+        matrix = self.open_mmap(meta, mode='r+')
+        col = {code: idx for idx, code in enumerate(codes, 1)}
+        for date in dates:
+            day_df = self.tasks_df.loc[[date]]
+            row = (date - start).days
+            matrix[row] = 0
+            matrix[row, day_df.code.astype(object).map(col).values] = \
+                self.get_mmap_hours(day_df.hours.values,
+                                    self.time_df.total[date])
+            matrix[row, 0] = self.time_df.total[date]
+        matrix.flush()
+        self.count_io(rows_written=len(dates),
+                      bytes_written=len(dates) * meta['width'] * 4)
+        del matrix
+        self.write_mmap_meta(meta)
+
+    def drop_mmap_day(self):
+        '''
+        Drop last day with work from matrix.
+        '''
+        meta = self.read_mmap_meta()
+        matrix = self.open_mmap(meta, mode='r+')
+        days = meta['days']
+        if days:
+            days -= 1
+            matrix[days] = 0
+        while days and not matrix[days - 1].any():
+            days -= 1
+        matrix.flush()
+        self.count_io(rows_written=1, bytes_written=meta['width'] * 4)
+        del matrix
+        meta['days'] = days
+        self.write_mmap_meta(meta)
@@ -0,0 +1,163 @@
+from data_processor import DataProcessor
+from visualizer import Visualizer
+
+from concurrent.futures import ProcessPoolExecutor
+import datetime as dt
+import hashlib
+import json
+import os
+
+
+class ReportWorker(DataProcessor, Visualizer):
+    '''
+    Class for rendering plots in worker process of report.
+    It is made from loaded data of DataBase (see
+    ReportRenderer.get_report_state) and does not read files.
+    '''
+    def __init__(self, state):
+        self.__dict__.update(state)
+        self.pendingRows = {}
+        self.pendingEntries = []
+        self.pendingCodes = []
+        self.dataVersion = 0
+
+    def get_sessions(self):
+        '''Return sessions of DataBase (see TimeCounter.get_sessions)'''
+        return self.sessions_df
+
+
+def render_jobs(state, jobs):
+    '''
+    Render plots of jobs (list of tuples of Visualizer method
+    name, args, kwargs and filename) by ReportWorker of state
+    with Agg backend. Return number of rendered plots.
+    '''
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    worker = ReportWorker(state)
+    for name, args, kwargs, filename in jobs:
+        getattr(worker, name)(*args, filename=filename, **kwargs)
+    return len(jobs)
+
+
+class ReportRenderer():
+    '''
+    impurity class for rendering all plots of Visualizer to .png
+    files of reportDir (in data path) by process pool
+    (reportWorkers processes, number of CPUs if None).
+    Plot is rendered again only if its data, arguments or
+    date (for periods relative to today) are changed (see
+    index file reportIndex).
+    Need ProcessPoolExecutor from concurrent.futures; datetime
+    as dt; hashlib; json; os; DataProcessor; Visualizer.
+    '''
+    reportDir = 'report'
+    reportIndex = 'index.json'
+    reportPeriods = ('week', 'month', 'year', 'full')
+    reportWorkers = None
+    reportAttrs = ('time_df', 'tasks_df', 'codes_df', 'summary_df',
+                   'summary_idx', 'code_tree', 'roundPlaces')
+
+    def get_data_digest(self):
+        '''
+        Return hex digest of loaded data (time_df, tasks_df and
+        summary_df). Digest is cached until data is changed
+        (see self.dataVersion).
+        '''
+        import pandas as pd
+        if getattr(self, 'digestVersion', None) != self.dataVersion:
+            digest = hashlib.sha1()
+            for df in (self.time_df, self.tasks_df, self.summary_df):
+                digest.update(pd.util.hash_pandas_object(df).values)
+            self.data_digest = digest.hexdigest()
+            self.digestVersion = self.dataVersion
+        return self.data_digest
+
+    def get_report_state(self):
+        '''Return dict of data for ReportWorker'''
+        state = {name: getattr(self, name) for name in self.reportAttrs}
+        state['sessions_df'] = self.get_sessions()
+        return state
+
+    def get_report_jobs(self, periods, tasks=()):
+        '''
+        Return list of tuples of Visualizer method name, args,
+        kwargs and filename (without dir) of report plots for
+        periods (list of str, see Visualizer.lineplot) and
+        tasks (list of str, see DataProcessor.check_task).
+        Incorrect period or task raise ValueError.
+        '''
+        codes = [self.check_task(task) for task in tasks]
+        jobs = [('hist_of_summary_hours', (), {}, 'summary_hours.png'),
+                ('hist_of_hours_per_day', (), {}, 'hours_per_day.png')]
+        for period in periods:
+            if period not in self.reportPeriods:
+                raise ValueError
+            for name in ('lineplot', 'expanding_lineplot', 'scatterplot'):
+                jobs.append((name, (), {'period': period},
+                             '{}_{}.png'.format(name, period)))
+                if codes:
+                    jobs.append((name, tuple(codes), {'period': period},
+                                 '{}_{}_{}.png'.format(name, period,
+                                                       '-'.join(codes))))
+            for code in ['all'] + codes:
+                jobs.append(('work_session_hist', (),
+                             {'task': code, 'period': period},
+                             'work_session_hist_{}_{}.png'.format(period,
+                                                                  code)))
+        return jobs
+
+    def get_job_key(self, job):
+        '''
+        Return cache key of plot job (see self.get_report_jobs):
+        data digest, job, size of session log for session
+        plots and today date for periods relative to today.
+        '''
+        name, args, kwargs, _ = job
+        key = [self.get_data_digest(), name, list(args),
+               sorted(kwargs.items())]
+        if name == 'work_session_hist':
+            self.get_sessions()
+            key.append(self.sessionLogSize)
+        if kwargs.get('period', 'full') != 'full':
+            key.append(dt.date.today().isoformat())
+        return hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+    def render_report(self, periods=None, tasks=()):
+        '''
+        Render report plots (see self.get_report_jobs) to files of
+        reportDir. Not changed plots are skipped.
+        Return tuple of report dir, number of rendered and
+        skipped plots.
+        '''
+        path = os.path.join(self.path + self.reportDir, '')
+        os.makedirs(path, exist_ok=True)
+        try:
+            with open(path + self.reportIndex) as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            index = {}
+
+        jobs = []
+        keys = {}
+        for job in self.get_report_jobs(periods or self.reportPeriods,
+                                        tasks):
+            filename = job[3]
+            keys[filename] = self.get_job_key(job)
+            if index.get(filename) != keys[filename] or \
+               not os.path.exists(path + filename):
+                jobs.append(job[:3] + (path + filename,))
+
+        if jobs:
+            workers = min(self.reportWorkers or os.cpu_count() or 1,
+                          len(jobs))
+            state = self.get_report_state()
+            with ProcessPoolExecutor(workers) as executor:
+                for _ in executor.map(render_jobs, [state] * workers,
+                                      [jobs[i::workers]
+                                       for i in range(workers)]):
+                    pass
+        index.update(keys)
+        with open(path + self.reportIndex, 'w') as file:
+            json.dump(index, file, indent=1)
+        return path, len(jobs), len(keys) - len(jobs)
@@ -0,0 +1,94 @@
+class Rollup():
+    '''
+    impurity class for weekly and monthly aggregates of time data.
+    Rollup of freq ("W" - weeks from Monday, "M" - months) is
+    pandas.DataFrame with (period, code) index and columns "time"
+    (sum of hours of code and its subcodes, see CodeTree) and
+    "days" (number of days with time of code > 0).
+    Code "" is total time of days (self.time_df.total).
+    Rollups are made on first use and updated by
+    self.upd_rollups when days are changed (see
+    DataProcessor.set_day_row). Other changes of data make them
+    again (see self.dataVersion).
+    pandas is imported by methods.
+    '''
+    rollupFreqs = ('W', 'M')
+    rollupRows = 12
+
+    def get_rollup(self, freq):
+        '''Return rollup of freq (see class doc)'''
+        if getattr(self, 'rollupVersion', None) != self.dataVersion:
+            self.rollups = {}
+            self.rollupVersion = self.dataVersion
+        if freq not in self.rollups:
+            self.rollups[freq] = self.calc_rollup(freq, self.tasks_df,
+                                                  self.time_df)
+        return self.rollups[freq]
+
+    def calc_rollup(self, freq, tasks_df, time_df):
+        '''
+        Return rollup of freq for rows of tasks_df and time_df
+        (see class doc).
+        '''
+        import pandas as pd
+        tasks_df = tasks_df[tasks_df.hours > 0]
+        chains = {code: [code] + (self.code_tree.ancestors(code)
+                                  if code in self.code_tree else [])
+                  for code in tasks_df.code.unique()}
+        hours = pd.DataFrame({'code': tasks_df.code.astype(object).map(
+                                  chains).values,
+                              'hours': tasks_df.hours.values},
+                             index=tasks_df.index).explode('code')
+        daily = hours.groupby([hours.index, 'code']).hours.sum()
+        periods = daily.index.get_level_values(0).to_period(freq)
+        codes = daily.index.get_level_values('code')
+        rollup = daily.groupby([periods, codes]).agg(['sum', 'count'])
+
+        total = time_df.total[time_df.total > 0]
+        total = total.groupby(total.index.to_period(freq)).agg(
+            ['sum', 'count'])
+        total.index = pd.MultiIndex.from_arrays(
+            [total.index, [''] * len(total)])
+        rollup = pd.concat([rollup, total]).sort_index()
+        rollup.index.names = ['period', 'code']
+        rollup.columns = ['time', 'days']
+        return rollup
+
+    def upd_rollups(self, days):
+        '''
+        Recalculate rows of made rollups for periods of
+        days (pandas.DatetimeIndex of changed days of data).
+        Must be called after change of self.tasks_df and
+        self.time_df and before increment of self.dataVersion.
+        '''
+        import pandas as pd
+        if getattr(self, 'rollupVersion', None) != self.dataVersion:
+            return
+        for freq, rollup in self.rollups.items():
+            periods = days.to_period(freq).unique()
+            start = periods.min().start_time
+            end = periods.max().end_time
+            tasks_idx = self.tasks_df.index
+            time_idx = self.time_df.index
+            rows = self.calc_rollup(
+                freq,
+                self.tasks_df[(tasks_idx >= start) & (tasks_idx <= end)],
+                self.time_df[(time_idx >= start) & (time_idx <= end)])
+            rollup = rollup[~rollup.index.get_level_values(
+                'period').isin(periods)]
+            self.rollups[freq] = pd.concat([rollup, rows]).sort_index()
+        self.rollupVersion += 1
+
+    def get_rollup_table(self, freq, code='', rows=None):
+        '''
+        Return pandas.DataFrame of last rows (rollupRows if None)
+        periods of rollup of freq for code ("" - total time) with
+        columns "time", "days" and "mean" (time per day).
+        '''
+        import numpy as np
+        rollup = self.get_rollup(freq)
+        table = rollup[rollup.index.get_level_values('code') == code]
+        table = table.droplevel('code').iloc[-(rows or self.rollupRows):].copy()
+        table['time'] = np.round(table.time, self.roundPlaces)
+        table['mean'] = np.round(table.time / table.days, self.roundPlaces)
+        return table
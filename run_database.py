@@ -1,8 +1,16 @@
+from command_stats import CommandStats
 from data_processor import DataProcessor
+from mmap_storage import MmapStorage
+from report import ReportRenderer
+from rollup import Rollup
+from server import DataBaseServer
+from sqlite_storage import SqliteStorage
 from time_counter import TimeCounter
 from visualizer import Visualizer
 
+import argparse
 import datetime as dt
+import json
 import logging
 import math
 import os
@@ -10,37 +18,55 @@ import re
 import random
 import sys
 
-import matplotlib.dates
-import matplotlib.pyplot
-import numpy as np
-import pandas as pd
 
-
-class DataBase(TimeCounter, DataProcessor, Visualizer):
+class DataBase(TimeCounter, DataProcessor, MmapStorage, SqliteStorage,
+               Rollup, Visualizer, ReportRenderer, CommandStats):
     '''Class for processing user commands.'''
-    commandsDict = {'/work (/w)': 'start or stop session',
+    commandsDict = {'/work (/w)': 'start or stop session. Time of ' + \
+                        'session with task is added to time_df on stop.\n' + \
+                        '    syntax: /w [{task}]',
                    '/pause (/p)': 'pause or resume session',
                    '/hours (/h)': 'convert minutes to hours',
                    '/setrp (/rp)': 'set round places.\n'+ \
                         '    syntax: /rp {int}',
                    '/check (/c)': 'check current working hours',
                    '/exit': 'break the main function',
-                   '/recommend (/r)': 'make recommendation for work',
+                   '/recommend (/r)': 'make recommendation for work ' + \
+                        '(or number of different recommendations).\n' + \
+                        '    syntax: /r [{number}]',
                    '/mean': 'get mean value of work time.\n' + \
-                        '    syntax: /mean [{period}]\n' + \
-                        '    period: full, year, month, week',
+                        '    syntax: /mean [{period} | {start} [{end}]]\n' + \
+                        '    period: full, year, month, week;\n' + \
+                        '    start, end: dates in yyyy-mm-dd format',
                    '/drop': 'drop last row from selected DataFrame'+ \
                         '(time_df (by defoult) or codes_df).\n' + \
                         '    syntax: /drop [{df_name}]',
                    '/updt (/add)': 'add or update last row from time_df\n' + \
-                        '    syntax: /ass {task} {time};\n' + \
+                        '    syntax: /add {task} {time} [{task} {time}...];\n' + \
                         '    task may be index of summary_df, name or code.',
                    '/updc': 'add row to codes_df.\n' + \
                         '    syntax: /updc {task} {code} {priority}',
-                   '/timedf': 'fast-load and show time_df',
-                   '/codesdf': 'fast-load and show codes_df',
+                   '/flush': 'write not saved rows to storage',
+                   '/import': 'import session log of other tracker ' + \
+                        '(.csv or .jsonl with timestamp, task and ' + \
+                        'minutes columns) to time_df.\n' + \
+                        '    syntax: /import {path}',
+                   '/stats': 'show latency (p50, p95, max) and I/O ' + \
+                        '(rows and bytes) of commands.\n' + \
+                        '    syntax: /stats [json [{path}] | reset]',
+                   '/timedf': 'show time_df',
+                   '/codesdf': 'show codes_df',
                    '/summary (/s)': 'show summary_df',
-                    '/week':'show work time for this week',
+                   '/weekly': 'show time, days with work and mean time ' + \
+                        'by weeks (of task with subtasks if task is ' + \
+                        'given).\n' + \
+                        '    syntax: /weekly [{task}] [{number_of_weeks}]',
+                   '/monthly': 'show time by months. ' + \
+                        'Syntax like /weekly',
+                    '/week':'show work time for this week or ' + \
+                        'for range of dates (of task with subtasks ' + \
+                        'if task is given).\n' + \
+                        '    syntax: /week [{task}] [{start} [{end}]]',
                     '/lineplot (/lp)': 'Draw lineplot date/hours.\n' + \
                         '    syntax: /lp [{period} [{smooth_flag} ' + \
                         '[*tasks]]].\n    period: full, year, month,' + \
@@ -52,15 +78,23 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
                         'Syntax like /lineplot without {smooth_flag}',
                     '/sumhourshist (/shh)': 'Draw histogramm of summary hours',
                     '/derdayhist (/pdh)': 'Draw histogramm of hours per day',
-                    '/worksessionhist (/wsh)': 'Draw work session time histogramm'}
+                    '/worksessionhist (/wsh)': 'Draw work session time histogramm',
+                    '/report': 'Render all plots to .png files of ' + \
+                        'report dir (not changed plots are skipped).\n' + \
+                        '    syntax: /report [{periods} [*tasks]].\n' + \
+                        '    periods: all or comma separated periods ' + \
+                        '(week,month...)'}
     
-    def __init__(self, rp=2, path=''):
+    def __init__(self, rp=2, path='', storage='csv'):
         self.roundPlaces = rp
         self.path = path
-        pd.set_option('mode.chained_assignment', None)
-        self.load_data(preprocessing=True)
-        self.set_summary_df()
-        self.save_data(preprocessing=True)
+        self.storage = storage
+        self.pendingRows = {}
+        self.pendingEntries = []
+        self.pendingCodes = []
+        self.dataVersion = 0
+        self.command_stats = {}
+        self.reset_io()
         logging.basicConfig(format = u'[%(asctime)s] %(message)s',
             filename=self.path+"work.log", level=logging.INFO)
         
@@ -75,13 +109,32 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
         for key, value in self.commandsDict.items():
             print('{0} - {1}'.format(key, value))
             
-    def cmd_work(self):
-        status, time = self.work_switch()
+    def cmd_work(self, full_input):
+        try:
+            code = ''
+            if len(full_input) > 1 and not self.workFlag:
+                code = self.check_task(full_input[1])
+        except (KeyError, ValueError):
+            print('Incorrect input. Please, use /w [{task_name}]')
+            return
+        status, time = self.work_switch(task=code)
         if status == 'started':
             self.upd_log('Time counting ' + status, make_output=True)
         else:
             self.upd_log('Time counting ' + status + ' [{}]'.format(time), 
                          make_output=True)
+            if self.sessionTask and time:
+                self.commit_session(time)
+
+    def commit_session(self, time):
+        '''Add time of stopped session to today row (see TimeCounter)'''
+        start = dt.datetime.fromtimestamp(self.startTime)
+        if start.date() != dt.date.today():
+            print('Session was started at {} (not today), its time was '
+                  'not added. Please, use /add'.format(start))
+            return
+        self.log_row(self.upd_time_df_many([(self.sessionTask, time)],
+                                           checked=True))
             
     def cmd_pause(self):
         try:
@@ -121,34 +174,57 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
             print('Plese, use /h {value >= 0}')
             
         
-    def cmd_recommend(self):
-        rec = self.make_recommendation()
-        print('Try some {}!'.format(rec))
-        self.upd_log('Recommendation requested ({})'.format(rec),
-                     make_output=False)
+    def cmd_recommend(self, full_input):
+        try:
+            if len(full_input) > 1:
+                size = int(full_input[1])
+                if size < 1:
+                    raise ValueError
+                rec = ', '.join(self.make_recommendation(size))
+            else:
+                rec = self.make_recommendation()
+            print('Try some {}!'.format(rec))
+            self.upd_log('Recommendation requested ({})'.format(rec),
+                         make_output=False)
+        except ValueError:
+            print('Plese, use /r [{value = integer > 0}]')
             
     def cmd_drop(self, df_name='time_df'):
         try:
-            self.load_data(preprocessing=False)
-            self.drop_last_row(df=df_name)
-            self.save_data(preprocessing=False)
+            self.drop_data_row(df=df_name)
             self.upd_log('Last row from {} was dropped!'.format(df_name), 
                          make_output=True)
         except:
             print('Incorrect input.')
-            self.close_data()
 
-    def cmd_updt(self, full_input):
+    def check_updt_input(self, full_input):
+        '''
+        Return True if full_input is correct /updt command
+        (see self.cmd_updt), else print hint and return False.
+        '''
         try:
-            task = full_input[1]
-            time = full_input[2]
-            date, tasks, ratios, \
-                total, action = self.upd_time_df(task=task, time=time)
-            self.upd_log(
-                'Row «{} - {} - {} - {}» was {} in time_df!'.format(
-                date, tasks, ratios, total, action), make_output=True)
-        except IndexError:
-            print('Incorrect input. Please, use /updt {task_name} {time}')
+            if len(full_input) < 3 or len(full_input) % 2 == 0:
+                raise IndexError
+            for task, time in zip(full_input[1::2], full_input[2::2]):
+                self.check_task(task)
+                float(time)
+            return True
+        except (IndexError, KeyError, ValueError):
+            print('Incorrect input. Please, use /updt {task_name} {time}',
+                  '[{task_name} {time}...]')
+            return False
+
+    def cmd_updt(self, full_input):
+        if self.check_updt_input(full_input):
+            entries = zip(full_input[1::2], full_input[2::2])
+            self.log_row(self.upd_time_df_many(entries))
+
+    def log_row(self, row):
+        '''Log row of time_df (see DataProcessor.upd_time_df_many)'''
+        date, tasks, ratios, total, action = row
+        self.upd_log(
+            'Row «{} - {} - {} - {}» was {} in time_df!'.format(
+            date, tasks, ratios, total, action), make_output=True)
 
     def cmd_updc(self, full_input):
         try:
@@ -163,21 +239,57 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
             print('Incorrect input.',
                   'Please, use /updc {task_name} {code} {priority}')
 
+    def cmd_import(self, full_input):
+        try:
+            sessions, days = self.import_sessions(full_input[1])
+            self.upd_log('{} sessions were imported to {} days of time_df'
+                         .format(sessions, days), make_output=True)
+        except (IndexError, KeyError, ValueError, OSError) as error:
+            print('Import failed ({!r}).'.format(error),
+                  'Please, use /import {path}')
+
+    def cmd_flush(self):
+        self.flush_data()
+        self.upd_log('Data was flushed')
+
+    def cmd_stats(self, full_input):
+        try:
+            mode = full_input[1].lower() if len(full_input) > 1 else ''
+            if mode == 'reset':
+                self.command_stats.clear()
+                print('Stats were reset')
+            elif mode == 'json' and len(full_input) > 2:
+                with open(full_input[2], 'w') as file:
+                    json.dump(self.get_stats(), file, indent=1)
+                print('Stats were written to {}'.format(full_input[2]))
+            elif mode == 'json':
+                print(json.dumps(self.get_stats(), indent=1))
+            elif mode:
+                raise ValueError
+            else:
+                print('{:<10}{:>7}{:>10}{:>10}{:>10}{:>10}{:>10}{:>12}{:>12}'
+                      .format('command', 'calls', 'p50 ms', 'p95 ms',
+                              'max ms', 'rows r', 'rows w',
+                              'bytes r', 'bytes w'))
+                for command, stats in self.get_stats().items():
+                    print('{:<10}{calls:>7}{p50_ms:>10.1f}{p95_ms:>10.1f}'
+                          '{max_ms:>10.1f}{rows_read:>10}{rows_written:>10}'
+                          '{bytes_read:>12}{bytes_written:>12}'
+                          .format(command, **stats))
+        except (ValueError, OSError):
+            print('Incorrect input!',
+                  'Use /stats [json [{path}] | reset]')
+
     def cmd_timedf(self):
-        self.load_data(preprocessing=False)
-        print(self.time_df)
-        self.close_data()
-        self.upd_log('Data was fast-loaded and closed to show time_df')
+        print(self.get_raw_time_df(self.time_df, self.tasks_df))
+        self.upd_log('time_df was shown')
 
     def cmd_codesdf(self):
-        self.load_data(preprocessing=False)
         print(self.codes_df)
-        self.close_data()
-        self.upd_log('Data was fast-loaded and closed to show codes_df')
+        self.upd_log('codes_df was shown')
 
     def cmd_lineplot(self, full_input):
         try:
-            self.load_data(preprocessing=True)
             if len(full_input) == 1:
                 self.lineplot()
             elif len(full_input) == 2:
@@ -191,7 +303,6 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
                 self.lineplot(*full_input[3:],
                               period=full_input[1],
                               smooth=smooth)
-            self.close_data()
             self.upd_log('Lineplot was drawn')
         except ValueError:
             print('Incorrect input!',
@@ -199,7 +310,6 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
 
     def cmd_explineplot(self, full_input):
         try:
-            self.load_data(preprocessing=True)
             if len(full_input) == 1:
                 self.expanding_lineplot()
             elif len(full_input) == 2:
@@ -213,7 +323,6 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
                 self.expanding_lineplot(*full_input[3:],
                                         period=full_input[1],
                                         smooth=smooth)
-            self.close_data()
             self.upd_log('Explineplot was drawn')
         except ValueError:
             print('Incorrect input!',
@@ -221,7 +330,6 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
 
     def cmd_scplot(self, full_input):
         try:
-            self.load_data(preprocessing=True)
             if len(full_input) == 1:
                 self.scatterplot()
             elif len(full_input) == 2:
@@ -229,7 +337,6 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
             else:
                 self.scatterplot(*full_input[2:],
                                  period=full_input[1])
-            self.close_data()
             self.upd_log('Scatterplot was drawn')
         except ValueError:
             print('Incorrect input!',
@@ -245,7 +352,6 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
 
     def cmd_worksessionhist(self, full_input):
         try:
-            self.load_data(preprocessing=True)
             if len(full_input) == 1:
                 self.work_session_hist()
             elif len(full_input) == 2:
@@ -253,97 +359,254 @@ class DataBase(TimeCounter, DataProcessor, Visualizer):
             else:
                 self.work_session_hist(period=full_input[1],
                                        task=full_input[2])
-            self.close_data()
             self.upd_log('Worksessionhist was drawn')
         except ValueError:
             print('Incorrect input!',
                   'Use /wsh [{period} [{task}]]')
 
-    def cmd_week(self):
-        self.load_data(preprocessing=True)
-        series = self.time_df.total
-        self.close_data()
-        time, days = self.this_week(series)
-        print("It's [{}] hours by {} days!".format(time, days))
-        self.upd_log('Week request: {} h by {} d'.format(time, days))
+    def cmd_report(self, full_input):
+        try:
+            periods = None
+            if len(full_input) > 1 and full_input[1] != 'all':
+                periods = full_input[1].split(',')
+            path, rendered, skipped = self.render_report(periods,
+                                                         full_input[2:])
+            self.upd_log('Report: {} plots were rendered, {} not changed '
+                         '({})'.format(rendered, skipped, path),
+                         make_output=True)
+        except (KeyError, ValueError):
+            print('Incorrect input!',
+                  'Use /report [{periods} [*tasks]]')
+
+    def cmd_week(self, full_input):
+        try:
+            code = None
+            if len(full_input) > 1 and '-' not in full_input[1]:
+                code = self.check_task(full_input.pop(1))
+            if len(full_input) == 1:
+                time, days = self.get_week_time(code)
+            else:
+                time, days = self.get_range_time(*full_input[1:3],
+                                                 code=code, subtree=True)
+            time = round(time, self.roundPlaces)
+            print("It's [{}] hours by {} days!".format(time, days))
+            self.upd_log('Week request: {} h by {} d'.format(time, days))
+        except (KeyError, ValueError):
+            print('Incorrect input!',
+                  'Use /week [{task}] [{start} [{end}]]')
+
+    def cmd_rollup(self, full_input, freq):
+        try:
+            args = full_input[1:]
+            rows = None
+            if args and args[-1].isnumeric():
+                rows = int(args.pop())
+            code = self.check_task(args[0]) if args else ''
+            print(self.get_rollup_table(freq, code, rows))
+            self.upd_log('{} request: {}'.format(full_input[0],
+                                                  code or 'total'))
+        except (KeyError, ValueError):
+            print('Incorrect input!',
+                  'Use {} [{{task}}] [{{number}}]'.format(full_input[0]))
 
     def cmd_mean(self, full_input):
         try:
-            self.load_data(preprocessing=True)
-            if len(full_input) != 1:
+            if len(full_input) == 1:
+                value = self.get_mean_time()
+                period = 'full period'
+            elif full_input[1] in ('full', 'year', 'month', 'week'):
                 period = full_input[1]
                 value = self.get_mean_time(period)
             else:
-                value = self.get_mean_time()
-                period = 'full period'
+                period = ' - '.join(full_input[1:3])
+                value = self.get_mean_time(*[None] + full_input[1:3])
             value = round(value, 2)
-            self.close_data()
             print('Mean time for {} is [{}]'.format(period, value))
             self.upd_log('Mean time request: {} - {}'.format(period,
                                                              value))
         except ValueError:
             print('Incorrect input!',
-                  'Use /mean [{period}]')
+                  'Use /mean [{period} | {start} [{end}]]')
         
     def input_processing(self):
         print('DataBase is running. Use /help to see available commands')
-        while True:
-            full_input = input().lower().split()
-            if full_input:
-                command = full_input[0]
-            else:
-                continue
-            
-            if command == '/help':
-                self.cmd_help()
-            elif command in ('/work', '/w'):
-                self.cmd_work()
-            elif command in ('/pause', '/p'):
-                self.cmd_pause()
-            elif command in ('/setrp', '/rp'):
-                self.cmd_setrp(full_input)
-            elif command in ('/check', '/c'):
-                self.cmd_check()
-            elif command in ('/hours', '/h'):
-                self.cmd_hours(full_input)
-            elif command in ('/recommend', '/r'):
-                self.cmd_recommend()
-            elif command == '/drop':
-                if len(full_input) == 1:
-                    self.cmd_drop()
-                else:
-                    self.cmd_drop(df_name=full_input[1])
-            elif command in ('/updt', '/add'):
-                self.cmd_updt(full_input)
-            elif command == '/updc':
-                self.cmd_updc(full_input)
-            elif command == '/timedf':
-                self.cmd_timedf()
-            elif command == '/codesdf':
-                self.cmd_codesdf()
-            elif command in ('/summary', '/s'):
-                print(self.summary_df)
-            elif command in ('/lineplot', '/lp'):
-                self.cmd_lineplot(full_input)
-            elif command in ('/explineplot', '/elp'):
-                self.cmd_explineplot(full_input)
-            elif command in ('/sumhourshist', '/shh'):
-                self.cmd_sumhourshist()
-            elif command in ('/perdayhourshist', '/pdh'):
-                self.cmd_perdayhourshist()
-            elif command in ('/worksessionhist', '/wsh'):
-                self.cmd_worksessionhist(full_input)
-            elif command in ('/scplot', '/scp'):
-                self.cmd_scplot(full_input)
-            elif command == '/week':
-                self.cmd_week()
-            elif command == '/mean':
-                self.cmd_mean(full_input)
-            elif command == '/exit':
-                break
+        if self.restore_session():
+            start = dt.datetime.fromtimestamp(self.startTime)
+            self.upd_log('Session started at {} was restored'.format(start),
+                         make_output=True)
+            if start.date() != dt.date.today():
+                print('Session was not started today, its time will '
+                      'not be added on stop')
+        try:
+            while self.execute(input().split()):
+                pass
+        finally:
+            self.close_session()
+
+    def batch_processing(self, lines):
+        '''
+        Run commands from lines (iterable of str, e.g. file or
+        sys.stdin) without interaction. Empty lines and lines
+        starting with "#" are skipped.
+
+        Consecutive /add (/updt) commands are merged into one
+        update of today row, it is written with other changed data
+        at the end of the group (see self.batch_updt), remaining
+        data is flushed once at the end.
+        '''
+        flush_size = self.flushSize
+        self.flushSize = float('inf')
+        adds = []
+        try:
+            for line in lines:
+                full_input = line.split()
+                command = full_input[0].lower() if full_input else ''
+                if command in ('/updt', '/add'):
+                    adds.append(line.lower().split())
+                    continue
+                if adds:
+                    self.timed('/add', self.batch_updt, adds)
+                    adds = []
+                if not full_input or command.startswith('#'):
+                    continue
+                if not self.execute(full_input):
+                    break
+            if adds:
+                self.timed('/add', self.batch_updt, adds)
+        finally:
+            self.flushSize = flush_size
+            self.close_session()
+
+    def batch_updt(self, adds):
+        '''
+        Add entries of correct /add commands (adds is list of
+        full_input lists) by one update of today row and flush
+        changed data. Input check (with loading of data), update
+        and writing are counted as one /add command in stats.
+        '''
+        entries = []
+        for full_input in adds:
+            if self.check_updt_input(full_input):
+                entries += full_input[1:]
+        if entries:
+            self.cmd_updt(['/add'] + entries)
+            self.flush_data()
+
+    def execute(self, full_input):
+        '''
+        Run command from full_input (list of str, command and
+        its arguments). Input is case insensitive except paths.
+        Return False for /exit command.
+
+        Latency and I/O of commands are counted
+        (see CommandStats and /stats command).
+        Data of sqlite storage changed by other process is
+        loaded again (see SqliteStorage.sync_sqlite).
+        '''
+        raw_input = full_input
+        full_input = [i.lower() for i in raw_input]
+        if full_input:
+            command = full_input[0]
+        else:
+            return True
+        if command == '/stats':
+            self.cmd_stats(raw_input)
+            return True
+        if self.storage == 'sqlite':
+            self.sync_sqlite()
+        return self.timed(command, self.dispatch, command,
+                          full_input, raw_input)
+
+    def dispatch(self, command, full_input, raw_input):
+        '''
+        Run user-command function of command (see self.execute).
+        Return False for /exit command.
+        '''
+        if command == '/help':
+            self.cmd_help()
+        elif command in ('/work', '/w'):
+            self.cmd_work(full_input)
+        elif command in ('/pause', '/p'):
+            self.cmd_pause()
+        elif command in ('/setrp', '/rp'):
+            self.cmd_setrp(full_input)
+        elif command in ('/check', '/c'):
+            self.cmd_check()
+        elif command in ('/hours', '/h'):
+            self.cmd_hours(full_input)
+        elif command in ('/recommend', '/r'):
+            self.cmd_recommend(full_input)
+        elif command == '/drop':
+            if len(full_input) == 1:
+                self.cmd_drop()
             else:
-                print('unknown command')
+                self.cmd_drop(df_name=full_input[1])
+        elif command in ('/updt', '/add'):
+            self.cmd_updt(full_input)
+        elif command == '/updc':
+            self.cmd_updc(full_input)
+        elif command == '/flush':
+            self.cmd_flush()
+        elif command == '/import':
+            self.cmd_import(raw_input)
+        elif command == '/timedf':
+            self.cmd_timedf()
+        elif command == '/codesdf':
+            self.cmd_codesdf()
+        elif command in ('/summary', '/s'):
+            print(self.summary_df)
+        elif command in ('/lineplot', '/lp'):
+            self.cmd_lineplot(full_input)
+        elif command in ('/explineplot', '/elp'):
+            self.cmd_explineplot(full_input)
+        elif command in ('/sumhourshist', '/shh'):
+            self.cmd_sumhourshist()
+        elif command in ('/perdayhourshist', '/pdh'):
+            self.cmd_perdayhourshist()
+        elif command in ('/worksessionhist', '/wsh'):
+            self.cmd_worksessionhist(full_input)
+        elif command in ('/scplot', '/scp'):
+            self.cmd_scplot(full_input)
+        elif command == '/report':
+            self.cmd_report(full_input)
+        elif command == '/week':
+            self.cmd_week(full_input)
+        elif command == '/weekly':
+            self.cmd_rollup(full_input, 'W')
+        elif command == '/monthly':
+            self.cmd_rollup(full_input, 'M')
+        elif command == '/mean':
+            self.cmd_mean(full_input)
+        elif command == '/exit':
+            return False
+        else:
+            print('unknown command')
+        return True
 
 if __name__ == '__main__':
-    db = DataBase()
-    db.input_processing()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('script', nargs='?',
+                        help='file with commands for batch mode')
+    parser.add_argument('--path', default='',
+                        help='dir with data files')
+    parser.add_argument('--storage', default='csv',
+                        choices=['csv', 'mmap', 'sqlite'],
+                        help='storage of time data')
+    parser.add_argument('--serve', metavar='ADDRESS',
+                        help='run server for many clients on host:port '
+                             'or Unix socket path')
+    args = parser.parse_args()
+
+    path = os.path.join(args.path, '')
+    if args.serve:
+        DataBaseServer(DataBase, path=path,
+                       storage=args.storage).run(args.serve)
+    else:
+        db = DataBase(path=path, storage=args.storage)
+        if args.script:
+            with open(args.script) as file:
+                db.batch_processing(file)
+        elif not sys.stdin.isatty():
+            db.batch_processing(sys.stdin)
+        else:
+            db.input_processing()
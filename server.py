@@ -0,0 +1,217 @@
+from contextlib import contextmanager
+import asyncio
+import io
+import os
+import sys
+import threading
+
+
+class ThreadOutput(io.TextIOBase):
+    '''
+    sys.stdout replacement for server threads: text printed by
+    thread inside self.capture is written to buffer of thread,
+    other text to original stream.
+    Need contextmanager from contextlib; io; sys; threading.
+    '''
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    @classmethod
+    def install(cls):
+        '''Set sys.stdout to ThreadOutput (once). Return it.'''
+        if not isinstance(sys.stdout, cls):
+            sys.stdout = cls(sys.stdout)
+        return sys.stdout
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (self.stream if buffer is None else buffer).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    @contextmanager
+    def capture(self):
+        '''Return io.StringIO with output of current thread'''
+        self.local.buffer = io.StringIO()
+        try:
+            yield self.local.buffer
+        finally:
+            self.local.buffer = None
+
+
+class DataBaseServer():
+    '''
+    asyncio TCP or Unix-socket server running DataBase commands
+    (see DataBase.execute) for many clients in one process.
+
+    One DataBase object (made by factory) is kept for each data
+    path, so data is loaded once and stays in memory for all
+    clients of path. Every client has own path (see /path command)
+    and own TimeCounter state (/work, /pause, /check).
+    Data paths are confined to path (server root) and its
+    subdirectories, commands with file paths (restrictedCommands,
+    /stats json {path}) are not available.
+
+    Protocol is line based: client sends command line, server
+    answers with output of command and line with single dot.
+    Commands are run in thread pool, commands of one data path
+    are run one by one (see self.run_locked). Output of commands
+    is captured by ThreadOutput.
+    Changes are written to storage by groups of flushSize entries
+    (and when client disconnects).
+    Need asyncio; io; os; ThreadOutput.
+    '''
+    timerAttrs = ('workFlag', 'pauseFlag', 'startTime', 'pauseTime',
+                  'sessionTask')
+    blockedCommands = ('/lineplot', '/lp', '/explineplot', '/elp',
+                       '/scplot', '/scp', '/sumhourshist', '/shh',
+                       '/perdayhourshist', '/pdh',
+                       '/worksessionhist', '/wsh')
+    restrictedCommands = ('/import',)
+    flushSize = 5
+
+    def __init__(self, factory, path='', storage='csv'):
+        self.factory = factory
+        self.path = os.path.join(os.path.realpath(path or os.curdir), '')
+        self.storage = storage
+        self.databases = {}
+        self.locks = {}
+
+    def get_database(self, path):
+        '''Return DataBase object of path (made on first call)'''
+        if path not in self.databases:
+            self.databases[path] = self.factory(path=path,
+                                                storage=self.storage)
+            #changes of clients are written by groups
+            self.databases[path].flushSize = self.flushSize
+        return self.databases[path]
+
+    def get_data_path(self, path):
+        '''
+        Return data path (with trailing separator) of path
+        relative to server root or raise ValueError if it is
+        outside of root.
+        '''
+        root = os.path.dirname(self.path)
+        path = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError('path is outside of server root')
+        return os.path.join(path, '')
+
+    def is_restricted(self, full_input):
+        '''Return True if command reads or writes file by path'''
+        command = full_input[0].lower()
+        return command in self.restrictedCommands or \
+            (command == '/stats' and len(full_input) > 2)
+
+    def run_command(self, session, full_input):
+        '''
+        Run command for client session (dict with "path" and
+        "timer" keys, see self.handle_client).
+        Return tuple of output (str) and False for /exit command
+        (else True).
+        '''
+        db = self.get_database(session['path'])
+        db.__dict__.update(session['timer'])
+        command = full_input[0].lower() if full_input else ''
+        going = True
+        with ThreadOutput.install().capture() as output:
+            try:
+                if command in self.blockedCommands:
+                    print('Plots are not available in server mode')
+                elif full_input and self.is_restricted(full_input):
+                    print('Command is not available in server mode')
+                elif command == '/path':
+                    try:
+                        path = self.get_data_path(full_input[1])
+                    except ValueError:
+                        print('Data path must be inside {}'.format(
+                            self.path))
+                    else:
+                        db.flush_data()
+                        session['path'] = path
+                        print('Data path is {}'.format(session['path']))
+                else:
+                    going = db.execute(full_input)
+            except Exception as error:
+                print('Command failed ({!r})'.format(error))
+        session['timer'] = {name: getattr(db, name)
+                            for name in self.timerAttrs}
+        for name in self.timerAttrs:
+            db.__dict__.pop(name, None)
+        return output.getvalue(), going
+
+    def flush_path(self, path):
+        '''Flush pending data of data path'''
+        self.get_database(path).flush_data()
+
+    async def run_locked(self, path, func, *args):
+        '''
+        Run func(*args) in thread pool of event loop while lock
+        of data path is held. Return result of func.
+        '''
+        if path not in self.locks:
+            self.locks[path] = asyncio.Lock()
+        async with self.locks[path]:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, func, *args)
+
+    async def handle_client(self, reader, writer):
+        '''
+        Serve one client connection until /exit or disconnect.
+        Pending data of client path is flushed at the end.
+        '''
+        session = {'path': self.path, 'timer': {}}
+        writer.write(b'DataBase server is running. '
+                     b'Use /help to see available commands\n.\n')
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                output, going = await self.run_locked(
+                    session['path'], self.run_command, session,
+                    line.decode().split())
+                writer.write(output.encode() + b'.\n')
+                await writer.drain()
+                if not going:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            await self.run_locked(session['path'], self.flush_path,
+                                  session['path'])
+            writer.close()
+
+    async def serve(self, address):
+        '''
+        Run server forever. address is "host:port" for TCP server
+        or path of Unix socket.
+        '''
+        if ':' in address:
+            host, port = address.rsplit(':', 1)
+            server = await asyncio.start_server(self.handle_client,
+                                                host, int(port))
+        else:
+            server = await asyncio.start_unix_server(self.handle_client,
+                                                     address)
+        async with server:
+            await server.serve_forever()
+
+    def run(self, address):
+        '''
+        Run server (see self.serve) until KeyboardInterrupt and
+        flush data of all paths (see DataBase.close_session).
+        '''
+        try:
+            asyncio.run(self.serve(address))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for db in self.databases.values():
+                db.close_session()
@@ -0,0 +1,282 @@
+from contextlib import closing
+import os
+import sqlite3
+
+
+class SqliteStorage():
+    '''
+    impurity class for storing time data and codes in SQLite
+    database file sqliteFile instead of time.csv and codes.csv.
+    Tables: days (date, total), tasks (date, code, ratio, hours;
+    one row for each task of day, indexed by date and code) and
+    codes (task, code, priority). Database is opened in WAL mode,
+    so several processes can share one file: /add entries are
+    added to stored days (not replace them) and loaded data is
+    dropped when other process writes to database (see
+    self.sync_sqlite).
+    Period and subtree queries can be run by SQL without loading
+    of data (see self.query_range_time).
+    I/O of database is counted in rows only (see CommandStats).
+    Need closing from contextlib; os; sqlite3. pandas is imported
+    by methods.
+    '''
+    sqliteFile = 'time.db'
+    sqliteTimeout = 10
+    sqliteSchema = '''
+        CREATE TABLE IF NOT EXISTS days (
+            date TEXT PRIMARY KEY,
+            total REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS tasks (
+            date TEXT NOT NULL,
+            code TEXT NOT NULL,
+            ratio REAL NOT NULL,
+            hours REAL NOT NULL);
+        CREATE INDEX IF NOT EXISTS tasks_date ON tasks (date);
+        CREATE INDEX IF NOT EXISTS tasks_code ON tasks (code, date);
+        CREATE TABLE IF NOT EXISTS codes (
+            task TEXT NOT NULL,
+            code TEXT NOT NULL,
+            priority REAL NOT NULL);
+        CREATE INDEX IF NOT EXISTS codes_code ON codes (code);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL);
+        INSERT OR IGNORE INTO meta VALUES ('writes', 0);
+        '''
+
+    def connect_sqlite(self):
+        '''
+        Return sqlite3.Connection to database (tables are created
+        if not exist).
+        '''
+        con = sqlite3.connect(self.path + self.sqliteFile,
+                              timeout=self.sqliteTimeout)
+        con.execute('PRAGMA journal_mode=WAL')
+        con.execute('PRAGMA synchronous=NORMAL')
+        con.executescript(self.sqliteSchema)
+        return con
+
+    @staticmethod
+    def upd_sqlite_writes(con):
+        '''Increase writes counter of database (see self.get_sqlite_writes)'''
+        con.execute("UPDATE meta SET value = value + 1 WHERE key = 'writes'")
+
+    def get_sqlite_writes(self, con=None):
+        '''
+        Return number of writes to database (by connection con
+        if given). It is part of snapshot key, because in WAL
+        mode database file can be not changed after writing.
+        '''
+        if con is None:
+            with closing(self.connect_sqlite()) as con:
+                return self.get_sqlite_writes(con)
+        return con.execute(
+            "SELECT value FROM meta WHERE key = 'writes'").fetchone()[0]
+
+    def sync_sqlite(self):
+        '''
+        Drop loaded data (it is loaded again on next access) if
+        other process wrote to database after loading and there
+        are no pending entries (see DataProcessor.flush_data).
+        '''
+        if 'tasks_df' in self.__dict__ and not self.get_pending_size() \
+           and self.get_sqlite_writes() != self.sqliteWrites:
+            self.close_data()
+
+    def load_sqlite(self):
+        '''
+        Set self.time_df, self.tasks_df (like after
+        self.time_df_preprocessing) and self.codes_df from database.
+        If database file not exists, it is made from .csv files.
+        '''
+        import pandas as pd
+        if not os.path.exists(self.path + self.sqliteFile):
+            self.load_data(preprocessing=False)
+            self.time_df_preprocessing(direction='forward')
+            self.write_sqlite()
+            return
+
+        with closing(self.connect_sqlite()) as con:
+            self.codes_df = pd.read_sql(
+                'SELECT task, code, priority FROM codes ORDER BY rowid', con)
+            time_df = pd.read_sql(
+                'SELECT date, total FROM days ORDER BY date', con,
+                index_col='date', parse_dates=['date'])
+            tasks_df = pd.read_sql(
+                'SELECT date, code, ratio, hours FROM tasks '
+                'ORDER BY date, rowid', con,
+                index_col='date', parse_dates=['date'])
+        self.count_io(rows_read=len(self.codes_df) + len(time_df) +
+                      len(tasks_df))
+
+        #missing days are filled like in time_df preprocessing
+        self.time_df = time_df.asfreq('1d').fillna(0)
+        empty = self.time_df.index.difference(tasks_df.index.unique())
+        tasks_df = pd.concat([tasks_df, pd.DataFrame(
+            {'code': '0', 'ratio': 1.0, 'hours': 0.0}, index=empty)])
+        self.tasks_df = self.compact_tasks_df(
+            tasks_df.sort_index(kind='stable'))
+
+    def write_sqlite(self):
+        '''
+        Write loaded self.time_df, self.tasks_df and self.codes_df
+        to database (replaces all rows) by one transaction.
+        '''
+        with closing(self.connect_sqlite()) as con, con:
+            con.execute('DELETE FROM days')
+            con.execute('DELETE FROM tasks')
+            con.execute('DELETE FROM codes')
+            con.executemany('INSERT INTO days VALUES (?, ?)', zip(
+                self.time_df.index.strftime('%Y-%m-%d'),
+                self.time_df.total.astype(float)))
+            con.executemany('INSERT INTO tasks VALUES (?, ?, ?, ?)', zip(
+                self.tasks_df.index.strftime('%Y-%m-%d'),
+                self.tasks_df.code,
+                self.tasks_df.ratio.astype(float),
+                self.tasks_df.hours.astype(float)))
+            con.executemany('INSERT INTO codes VALUES (?, ?, ?)', zip(
+                self.codes_df.task, self.codes_df.code,
+                self.codes_df.priority.astype(float)))
+            self.upd_sqlite_writes(con)
+            self.sqliteWrites = self.get_sqlite_writes(con)
+        self.count_io(rows_written=len(self.codes_df) + len(self.time_df) +
+                      len(self.tasks_df))
+
+    def write_sqlite_days(self, entries, codes=0):
+        '''
+        Add entries to stored days and write last codes rows of
+        self.codes_df to database by one transaction.
+        entries is list of tuples of date (str, "%Y-%m-%d"), code
+        and time (float) of pending /add entries, codes is number
+        of rows. Stored days are read in transaction and entries
+        are merged to them (see DataProcessor.merge_task_time),
+        so entries of other processes are not lost. Loaded data is
+        dropped if other process wrote to database after loading
+        (see self.sync_sqlite).
+        '''
+        days = {}
+        for date, code, time in entries:
+            days.setdefault(date, []).append((code, time))
+        rows = codes
+        with closing(self.connect_sqlite()) as con, con:
+            con.execute('BEGIN IMMEDIATE')
+            writes = self.get_sqlite_writes(con)
+            if codes:
+                codes_df = self.codes_df[-codes:]
+                con.executemany('INSERT INTO codes VALUES (?, ?, ?)', zip(
+                    codes_df.task, codes_df.code,
+                    codes_df.priority.astype(float)))
+            for date, day_entries in days.items():
+                row = self.query_day_row(con, date)
+                for code, time in day_entries:
+                    row = (date,) + self.merge_task_time(row, code, time)
+                _, tasks, ratios, total = row
+                con.execute('INSERT OR REPLACE INTO days VALUES (?, ?)',
+                            (date, total))
+                con.execute('DELETE FROM tasks WHERE date = ?', (date,))
+                con.executemany(
+                    'INSERT INTO tasks VALUES (?, ?, ?, ?)',
+                    [(date, code, float(ratio), float(ratio) * total)
+                     for code, ratio in zip(tasks.split(),
+                                            ratios.split())])
+                rows += len(tasks.split()) + 1
+            self.upd_sqlite_writes(con)
+        self.count_io(rows_written=rows)
+        changed = writes != self.sqliteWrites
+        self.sqliteWrites = writes + 1
+        if changed:
+            self.close_data()
+
+    def query_day_row(self, con, date):
+        '''
+        Return tuple of date, tasks, ratios (strings) and total
+        of stored day (like DataProcessor.get_day_row) or None
+        if there is no day with work in database.
+        con is sqlite3.Connection, date is str ("%Y-%m-%d").
+        '''
+        day = con.execute('SELECT total FROM days WHERE date = ?',
+                          (date,)).fetchone()
+        tasks = con.execute('SELECT code, ratio FROM tasks WHERE date = ? '
+                            'ORDER BY rowid', (date,)).fetchall()
+        self.count_io(rows_read=len(tasks) + 1)
+        if day is None or not tasks:
+            return None
+        return (date, ' '.join(code for code, _ in tasks),
+                ' '.join(str(ratio) for _, ratio in tasks), day[0])
+
+    def drop_sqlite_row(self, df='time_df'):
+        '''
+        Delete last day (df is "time_df") or last code
+        (df is "codes_df") from database.
+        Incorrect df raise ValueError.
+        '''
+        if df == 'time_df':
+            query = ('DELETE FROM {} WHERE date = '
+                     '(SELECT MAX(date) FROM days)')
+            tables = ('tasks', 'days')
+        elif df == 'codes_df':
+            query = ('DELETE FROM {} WHERE rowid = '
+                     '(SELECT MAX(rowid) FROM codes)')
+            tables = ('codes',)
+        else:
+            raise ValueError
+        rows = 0
+        with closing(self.connect_sqlite()) as con, con:
+            for table in tables:
+                rows += con.execute(query.format(table)).rowcount
+            self.upd_sqlite_writes(con)
+        self.count_io(rows_written=rows)
+
+    def query_last_date(self):
+        '''Return last date of database as pandas.Timestamp or None'''
+        import pandas as pd
+        with closing(self.connect_sqlite()) as con:
+            date, = con.execute('SELECT MAX(date) FROM days').fetchone()
+        return None if date is None else pd.Timestamp(date)
+
+    def query_range_time(self, start=None, end=None, code=None,
+                         subtree=False):
+        '''
+        SQL version of self.get_range_time for not loaded data.
+        Return tuple of sum of hours and number of days with work
+        between dates start and end (inclusive).
+
+        start, end: str ("%Y-%m-%d") or datetime. None for first
+        and last dates of database.
+        code: str (task code) or None (total time, every day
+        of interval is counted).
+        subtree: count time of subcodes of code too
+        (codes "code_*").
+        Incorrect dates raise ValueError.
+        '''
+        import pandas as pd
+        with closing(self.connect_sqlite()) as con:
+            first, last = con.execute(
+                'SELECT MIN(date), MAX(date) FROM days').fetchone()
+            if first is None:
+                return (0.0, 0)
+            first, last = pd.Timestamp(first), pd.Timestamp(last)
+            if start is not None:
+                first = max(pd.Timestamp(start), first)
+            if end is not None:
+                last = min(pd.Timestamp(end), last)
+            if last < first:
+                return (0.0, 0)
+
+            args = [first.strftime('%Y-%m-%d'), last.strftime('%Y-%m-%d')]
+            if code is None:
+                time, = con.execute(
+                    'SELECT TOTAL(total) FROM days '
+                    'WHERE date BETWEEN ? AND ?', args).fetchone()
+                return (time, (last - first).days + 1)
+
+            condition = 'code = ?'
+            args.append(code)
+            if subtree:
+                condition = '(code = ? OR code GLOB ?)'
+                args.append(code + '_*')
+            time, days = con.execute(
+                'SELECT TOTAL(hours), COUNT(DISTINCT date) FROM tasks '
+                'WHERE date BETWEEN ? AND ? AND ' + condition,
+                args).fetchone()
+        return (time, days)
@@ -0,0 +1,30 @@
+'''
+Index of tasks tree (CodeTree from code_tree.py).
+'''
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from code_tree import CodeTree
+
+
+def test_prefix_of_code_is_not_its_ancestor():
+    tree = CodeTree(['0', '0_1', '0_10', '0_1_0', '0_10_1'])
+    assert tree.descendants('0_1') == ['0_1', '0_1_0']
+    assert tree.parent('0_10_1') == '0_10'
+    assert tree.ancestors('0_10_1') == ['0_10', '0']
+    assert sorted(tree.leaves()) == ['0_10_1', '0_1_0']
+
+
+def test_add_intermediate_code():
+    tree = CodeTree(['0', '0_10', '0_1_2', '0_1_3_4'])
+    assert tree.parent('0_1_2') == '0'
+    tree.add('0_1')
+    assert tree.parent('0_1') == '0'
+    assert sorted(tree.children('0')) == ['0_1', '0_10']
+    assert tree.children('0_1') == ['0_1_2', '0_1_3_4']
+    assert tree.ancestors('0_1_3_4') == ['0_1', '0']
+    assert not tree.is_leaf('0_1') and tree.is_leaf('0_10')
+    assert len(tree) == 5
@@ -0,0 +1,48 @@
+'''
+Conversion of time.csv rows to long format of tasks
+(DataProcessor.get_tasks_df and DataProcessor.get_raw_time_df).
+'''
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_processor import DataProcessor
+
+
+def make_time_df(tasks, ratios, total):
+    '''Return time_df like read from time.csv (date index).'''
+    return pd.DataFrame(
+        {'tasks': tasks, 'ratios': ratios, 'total': total},
+        index=pd.date_range('2025-01-01', periods=len(total),
+                            name='date'))
+
+
+def test_raw_time_df_of_tasks_df_is_time_df():
+    time_df = make_time_df(['0_1 0_10', '0', '0_1_2'],
+                           ['0.25 0.75', '1.0', '1.0'], [2.0, 0.0, 3.5])
+    tasks_df = DataProcessor.get_tasks_df(time_df)
+    assert list(tasks_df.code) == ['0_1', '0_10', '0', '0_1_2']
+    assert list(tasks_df.hours) == [0.5, 1.5, 0.0, 3.5]
+    raw_df = DataProcessor.get_raw_time_df(time_df[['total']], tasks_df)
+    pd.testing.assert_frame_equal(raw_df, time_df, check_freq=False)
+
+
+def test_tasks_separated_by_several_spaces():
+    time_df = make_time_df(['0_1  0_2', '0'], ['0.5 0.5', '1.0'],
+                           [2.0, 1.0])
+    tasks_df = DataProcessor.get_tasks_df(time_df)
+    assert list(tasks_df.code) == ['0_1', '0_2', '0']
+    assert list(tasks_df.index.day) == [1, 1, 2]
+
+
+def test_numbers_of_tasks_and_ratios_of_day_differ():
+    #totals of tasks and ratios are equal, rows are not
+    time_df = make_time_df(['0_1 0_2', '0_3'], ['1.0', '0.5 0.5'],
+                           [2.0, 1.0])
+    with pytest.raises(ValueError, match='2025-01-01'):
+        DataProcessor.get_tasks_df(time_df)
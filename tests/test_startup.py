@@ -0,0 +1,35 @@
+'''
+Startup budget of run_database: time commands (/w, /p, /c, /h)
+must run without pandas, numpy and matplotlib and in
+benchmark.STARTUP_BUDGET seconds (see benchmark.run_startup).
+'''
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import benchmark
+
+
+def run_script(path):
+    '''Run benchmark.STARTUP_SCRIPT. Return tuple of time and output.'''
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', benchmark.STARTUP_SCRIPT,
+         os.path.join(str(path), '')], cwd=ROOT, check=True,
+        capture_output=True, text=True).stdout
+    return time.perf_counter() - start, output
+
+
+def test_time_commands_do_not_import_heavy_modules(tmp_path):
+    _, output = run_script(tmp_path)
+    assert json.loads(output.splitlines()[-1]) == []
+
+
+def test_startup_is_in_budget(tmp_path):
+    best = min(run_script(tmp_path)[0] for _ in range(3))
+    assert best < benchmark.STARTUP_BUDGET
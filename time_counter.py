@@ -1,41 +1,127 @@
 import datetime as dt
+import os
 
 
 class TimeCounter():
     '''
     Class for counting time.
-    Need datetime as dt.
+    Start, pause, resume and stop events are appended to session
+    log (sessionLog file in self.path, None - no log), so session
+    can be restored after crash (see self.restore_session) and
+    durations of sessions can be read (see self.get_sessions).
+    Line of log: timestamp, event, session (timestamp of its
+    start) and task code.
+    Need datetime as dt; os. pandas is imported by methods.
     '''
     pauseFlag = False
     workFlag = False
     pauseTime = 0
     startTime = 0
+    sessionTask = ''
     roundPlaces = 2
+    sessionLog = 'sessions.log'
 
-    def work_switch(self):
+    def work_switch(self, task=''):
         '''
         Main time counting method.
         Use to start or stop counting process.
         Return typle of status (str) and time (float).
         If counting not started, time is None.
+        task (code) is saved for started session (see sessionTask).
 
         Changes class attributes: workFlag, pauseFlag,
-        startTime, pauseTime.
+        startTime, pauseTime, sessionTask.
         '''
         work_time = None
+        now = dt.datetime.now().timestamp()
         if self.workFlag:
             if self.pauseFlag:
                 self.pause()
-            self.workFlag = False
+            work_time = self.get_work_time(now)
+            self.set_session_event('stop', now)
             status = 'stopped'
-            work_time = self.get_work_time()
         else:
-            self.workFlag = True
-            self.startTime = dt.datetime.now().timestamp()
-            self.pauseTime = 0
+            self.set_session_event('start', now, task)
             status = 'started'
         return (status, work_time)
-            
+
+    def set_session_event(self, event, timestamp, task='', log=True):
+        '''
+        Change state of counting by event ("start", "pause",
+        "resume" or "stop") at timestamp (float) and append it
+        to session log (if log).
+        '''
+        if event == 'start':
+            self.workFlag = True
+            self.pauseFlag = False
+            self.startTime = timestamp
+            self.pauseTime = 0
+            self.sessionTask = task
+        elif event in ('pause', 'resume'):
+            self.pauseFlag = event == 'pause'
+            self.pauseTime = timestamp - self.pauseTime
+        elif event == 'stop':
+            self.workFlag = False
+        else:
+            raise ValueError
+        if log and self.sessionLog is not None:
+            with open(self.path + self.sessionLog, 'a') as file:
+                file.write('{:.3f},{},{:.3f},{}\n'.format(
+                    timestamp, event, self.startTime, self.sessionTask))
+
+    def restore_session(self):
+        '''
+        Restore last not stopped session from session log
+        (e.g. after crash). Return True if session was restored.
+        '''
+        if self.sessionLog is None or \
+           not os.path.exists(self.path + self.sessionLog):
+            return False
+        with open(self.path + self.sessionLog) as file:
+            lines = [line.split(',') for line in file if line.strip()]
+        if not lines or lines[-1][1] == 'stop':
+            return False
+        session = lines[-1][2]
+        for timestamp, event, start, task in lines:
+            if start == session:
+                self.set_session_event(event, float(timestamp),
+                                       task.strip(), log=False)
+        return self.workFlag
+
+    def get_sessions(self):
+        '''
+        Return pandas.DataFrame of stopped sessions of session
+        log: index is start datetime, columns are "code" (task
+        code or "") and "hours" (time of work without pauses).
+        DataFrame is cached until log is changed.
+        '''
+        import pandas as pd
+        filename = self.path + self.sessionLog
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        if getattr(self, 'sessionLogSize', None) != size:
+            if size:
+                events = pd.read_csv(filename, header=None,
+                                     names=['time', 'event', 'session',
+                                            'code'],
+                                     dtype={'code': str}).fillna('')
+            else:
+                events = pd.DataFrame({'time': [], 'event': [],
+                                       'session': [], 'code': []})
+            sign = events.event.map({'start': -1, 'resume': -1,
+                                     'pause': 1, 'stop': 1})
+            grouped = (events.time * sign).groupby(events.session)
+            stopped = events.session[events.event == 'stop'].unique()
+            starts = events[events.event == 'start'].set_index('session')
+            sessions = pd.DataFrame({
+                'code': starts.code.reindex(stopped).fillna('').values,
+                'hours': grouped.sum().reindex(stopped).values / 3600},
+                index=pd.DatetimeIndex(
+                    [dt.datetime.fromtimestamp(i) for i in stopped],
+                    name='start'))
+            self.sessions_df = sessions.sort_index()
+            self.sessionLogSize = size
+        return self.sessions_df
+
     def pause(self):
         '''
         Time counting method.
@@ -47,15 +133,15 @@ class TimeCounter():
         '''
         work_time = None
         if self.workFlag:
+            now = dt.datetime.now().timestamp()
             if self.pauseFlag:
-                self.pauseFlag = False
+                event = 'resume'
                 status = 'OFF'
             else:
-                self.pauseFlag = True
+                event = 'pause'
                 status = 'ON'
-                work_time = self.get_work_time()
-            self.pauseTime = dt.datetime.now().timestamp() - \
-                             self.pauseTime
+                work_time = self.get_work_time(now)
+            self.set_session_event(event, now)
             return (status, work_time)
 
     def minutes_to_hours(self, minutes):
@@ -72,17 +158,12 @@ class TimeCounter():
         else:
             return None
 
-    def get_work_time(self):
-        '''Raw method. Return current time of work.
+    def get_work_time(self, timestamp=None):
+        '''Raw method. Return current time of work
+        (or time of work at timestamp).
         Despite the class flags'''
-        return round((dt.datetime.now().timestamp() - 
+        if timestamp is None:
+            timestamp = dt.datetime.now().timestamp()
+        return round((timestamp - 
                       self.startTime - self.pauseTime)/3600,
                      self.roundPlaces)
-
-    @staticmethod
-    def this_week(series_with_dt_index):
-        '''Count work time for this week'''
-        last_date = series_with_dt_index.index[-1]
-        week_day = dt.datetime.isoweekday(last_date)
-        time = series_with_dt_index.iloc[-week_day:].sum()
-        return time, week_day
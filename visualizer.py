@@ -1,13 +1,81 @@
-import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
-
 import datetime as dt
 
 
 class Visualizer():
-    def lineplot(self, *tasks, period='full', smooth=True):
+    '''
+    impurity class for data visualization.
+    Plots of several tasks use one time matrix of tasks (see
+    DataProcessor.get_tasks_time_matrix).
+    Series of line and scatter plots are downsampled to
+    maxPoints points (see self.downsample, None - no limit).
+    matplotlib and numpy are imported by methods on first use.
+    '''
+    maxPoints = 2000
+
+    def downsample(self, series):
+        '''
+        Return pandas.Series with about maxPoints points of series
+        (min/max bucketing: series is split into maxPoints / 2
+        buckets, minimum and maximum of every bucket are kept in
+        original order, so peaks are not lost). First and last
+        points are kept too.
+        '''
+        import numpy as np
+        if self.maxPoints is None or len(series) <= self.maxPoints:
+            return series
+        buckets = max(self.maxPoints // 2, 1)
+        size = -(-len(series) // buckets)
+        values = np.full(buckets * size, np.nan)
+        values[:len(series)] = series.values
+        values = values.reshape(buckets, size)
+        filled = ~np.isnan(values).all(axis=1)
+        values = values[filled]
+        offsets = np.flatnonzero(filled) * size
+        idx = np.concatenate([[0, len(series) - 1],
+                              offsets + np.nanargmin(values, axis=1),
+                              offsets + np.nanargmax(values, axis=1)])
+        return series.iloc[np.unique(idx)]
+
+    def get_period_start(self, period):
+        '''
+        Return first date (str) of period ("full", "year",
+        "month", "week") of plots. Incorrect input raise ValueError.
+        '''
+        if period == 'full':
+            return self.time_df.total.index[0].strftime('%Y-%m-%d')
+        elif period == 'year':
+            days = 365
+        elif period == 'month':
+            days = 30
+        elif period == 'week':
+            days = 7
+        else:
+            raise ValueError
+        return (dt.datetime.today() - 
+                dt.timedelta(days=days)).strftime('%Y-%m-%d')
+
+    def get_tasks_matrix(self, tasks):
+        '''
+        Return tuple of list of codes of tasks (see
+        DataProcessor.check_task) and their time matrix
+        (see DataProcessor.get_tasks_time_matrix).
+        '''
+        codes = list(dict.fromkeys(self.check_task(task) for task in tasks))
+        return codes, self.get_tasks_time_matrix(codes)
+
+    def show_plot(self, filename=None):
+        '''
+        Show current figure or save it to filename (str) and
+        close it (for headless rendering, see ReportRenderer).
+        '''
+        import matplotlib.pyplot as plt
+        if filename is None:
+            plt.show()
+        else:
+            plt.savefig(filename)
+            plt.close()
+
+    def lineplot(self, *tasks, period='full', smooth=True, filename=None):
         '''
         Lineplot date/hours. Need self.time_df pandas.DataFrame (!).
 
@@ -21,37 +89,30 @@ class Visualizer():
         time interval of plot. Incorrect input raise ValueError;
         
         smooth: bool - smooth plot
+
+        filename: str - save plot to file instead of showing
+        (see self.show_plot)
         '''
-        if period == 'full':
-            date = self.time_df.total.index[0].strftime('%Y-%m-%d')
-        elif period == 'year':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=365)).strftime('%Y-%m-%d')
-        elif period == 'month':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=30)).strftime('%Y-%m-%d')
-        elif period == 'week':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=7)).strftime('%Y-%m-%d')
-        else:
-            raise ValueError
+        import matplotlib.pyplot as plt
+        date = self.get_period_start(period)
             
         if tasks:
-            for task in tasks:
-                code = self.check_task(task)
-                series = self.get_task_time_series(code)
-                series = series.asfreq('1d', fill_value=0)[date:]
-                if smooth:
-                    series = series.rolling(7, min_periods=1).mean()
+            codes, matrix = self.get_tasks_matrix(tasks)
+            matrix = matrix[date:]
+            if smooth:
+                matrix = matrix.rolling(7, min_periods=1).mean().where(
+                    matrix.notna())
+            for code in codes:
                 name = self.get_name_by_code(code)
-                plt.plot(series, label=name)
+                plt.plot(self.downsample(matrix[code].dropna()), label=name)
             plt.legend()
         else:
             series = self.time_df.total[date:]
             if smooth:
                 series = series.rolling(7, min_periods=1).mean()
-            plt.plot(series)
             mean = series.mean()
+            series = self.downsample(series)
+            plt.plot(series)
             series = series.apply(lambda x: mean)
             plt.plot(series, '--r', linewidth=1)
         plt.grid(True)
@@ -59,9 +120,10 @@ class Visualizer():
         plt.ylabel('hours', fontsize=15)
         plt.title('Lineplot', fontsize=17)
         plt.gcf().autofmt_xdate()
-        plt.show()
+        self.show_plot(filename)
         
-    def expanding_lineplot(self, *tasks, period='full', smooth=True):
+    def expanding_lineplot(self, *tasks, period='full', smooth=True,
+                           filename=None):
         '''
         Expandind lineplot date/sum_of_hours.
         Need self.time_df pandas.DataFrame (!).
@@ -76,47 +138,38 @@ class Visualizer():
         time interval of plot. Incorrect input raise ValueError;
         
         smooth: bool - smooth plot
+
+        filename: str - save plot to file instead of showing
+        (see self.show_plot)
         '''
-        if period == 'full':
-            date = self.time_df.total.index[0].strftime('%Y-%m-%d')
-        elif period == 'year':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=365)).strftime('%Y-%m-%d')
-        elif period == 'month':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=30)).strftime('%Y-%m-%d')
-        elif period == 'week':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=7)).strftime('%Y-%m-%d')
-        else:
-            raise ValueError
+        import matplotlib.pyplot as plt
+        date = self.get_period_start(period)
             
         if tasks:
-            for task in tasks:
-                code = self.check_task(task)
-                series = self.get_task_time_series(code)
-                series = series.asfreq('1d', fill_value=0)
-                series = series.expanding().sum()[date:]
-                if smooth:
-                    series = series.rolling(7, min_periods=1).mean()
+            codes, matrix = self.get_tasks_matrix(tasks)
+            matrix = matrix.expanding().sum().where(matrix.notna())[date:]
+            if smooth:
+                matrix = matrix.rolling(7, min_periods=1).mean().where(
+                    matrix.notna())
+            for code in codes:
                 name = self.get_name_by_code(code)
-                plt.plot(series, label=name)
+                plt.plot(self.downsample(matrix[code].dropna()), label=name)
             plt.legend()
         else:
             series = self.time_df.total
             series = series.expanding().sum()[date:]
             if smooth:
                 series = series.rolling(7, min_periods=1).mean()
-            plt.plot(series)
+            plt.plot(self.downsample(series))
             plt.plot(series.iloc[[0,-1]], '--r', linewidth=1)
         plt.grid(True)
         plt.xlabel('date', fontsize=15)
         plt.ylabel('hours', fontsize=15)
         plt.title('Expanding lineplot', fontsize=17)
         plt.gcf().autofmt_xdate()
-        plt.show()
+        self.show_plot(filename)
         
-    def scatterplot(self, *tasks, period='full'):
+    def scatterplot(self, *tasks, period='full', filename=None):
         '''
         Expandind lineplot date/sum_of_hours.
         Need self.time_df pandas.DataFrame (!).
@@ -129,33 +182,26 @@ class Visualizer():
 
         period: str (values: "full", "year", "month", "week")
         time interval of plot. Incorrect input raise ValueError;
+
+        filename: str - save plot to file instead of showing
+        (see self.show_plot)
         '''
-        if period == 'full':
-            date = self.time_df.total.index[0].strftime('%Y-%m-%d')
-        elif period == 'year':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=365)).strftime('%Y-%m-%d')
-        elif period == 'month':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=30)).strftime('%Y-%m-%d')
-        elif period == 'week':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=7)).strftime('%Y-%m-%d')
-        else:
-            raise ValueError
+        import matplotlib.pyplot as plt
+        date = self.get_period_start(period)
             
         if tasks:
-            for task in tasks:
-                code = self.check_task(task)
-                series = self.get_task_time_series(code)
-                series = series.asfreq('1d', fill_value=0)[date:]
+            codes, matrix = self.get_tasks_matrix(tasks)
+            matrix = matrix[date:]
+            for code in codes:
                 name = self.get_name_by_code(code)
-                plt.plot(series, 'o', label=name)
+                plt.plot(self.downsample(matrix[code].dropna()), 'o',
+                         label=name)
             plt.legend()
         else:
             series = self.time_df.total[date:]
-            plt.plot(series, 'o')
             mean = series.mean()
+            series = self.downsample(series)
+            plt.plot(series, 'o')
             series = series.apply(lambda x: mean)
             plt.plot(series, '--r', linewidth=1)
         plt.grid(True)
@@ -163,13 +209,16 @@ class Visualizer():
         plt.ylabel('hours', fontsize=15)
         plt.title('Scatterplot', fontsize=17)
         plt.gcf().autofmt_xdate()
-        plt.show()
+        self.show_plot(filename)
         
-    def hist_of_summary_hours(self):
+    def hist_of_summary_hours(self, filename=None):
         '''
         Histogramm of end tasks tree summary hours.
         Need self.summary_df pandas.DataFrame (!).
+        filename: str - save plot to file instead of showing
+        (see self.show_plot)
         '''
+        import matplotlib.pyplot as plt
         mask = self.get_end_codes()
         plt.bar(self.summary_df.task[mask],
                 self.summary_df[mask].total_time)
@@ -177,13 +226,16 @@ class Visualizer():
         plt.xlabel('task', fontsize=15)
         plt.ylabel('hours', fontsize=15)
         plt.title('Histogram of summary time', fontsize=17)
-        plt.show()
+        self.show_plot(filename)
         
-    def hist_of_hours_per_day(self):
+    def hist_of_hours_per_day(self, filename=None):
         '''
         Histogramm of end tasks tree hours per day.
         Need self.summary_df pandas.DataFrame (!).
+        filename: str - save plot to file instead of showing
+        (see self.show_plot)
         '''
+        import matplotlib.pyplot as plt
         mask = self.get_end_codes()
         plt.bar(self.summary_df.task[mask],
                 self.summary_df[mask].per_day)
@@ -191,11 +243,14 @@ class Visualizer():
         plt.xlabel('task', fontsize=15)
         plt.ylabel('hours', fontsize=15)
         plt.title('Histogram of time per day', fontsize=17)
-        plt.show()
+        self.show_plot(filename)
         
-    def work_session_hist(self, task='all', period='full'):
+    def work_session_hist(self, task='all', period='full', filename=None):
         '''
         Histogramm of work session time.
+        Durations of sessions are read from session log (see
+        TimeCounter.get_sessions), daily time of data is used
+        if log has no sessions.
         Need self.time_df pandas.DataFrame (!).
 
         task: str (values: "all" or DataProcessor.check_task values)
@@ -203,27 +258,24 @@ class Visualizer():
 
         period: str (values: "full", "year", "month", "week")
         time interval of hist base. Incorrect input raise ValueError;
+
+        filename: str - save plot to file instead of showing
+        (see self.show_plot)
         '''
-        if period == 'full':
-            date = self.time_df.total.index[0].strftime('%Y-%m-%d')
-        elif period == 'year':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=365)).strftime('%Y-%m-%d')
-        elif period == 'month':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=30)).strftime('%Y-%m-%d')
-        elif period == 'week':
-            date = (dt.datetime.today() - 
-                    dt.timedelta(days=7)).strftime('%Y-%m-%d')
-        else:
-            raise ValueError
+        import matplotlib.pyplot as plt
+        date = self.get_period_start(period)
         
+        sessions = self.get_sessions()
         if task == 'all':
-            series = self.time_df.total[date:]
+            series = sessions.hours[date:] if len(sessions) else \
+                self.time_df.total[date:]
             label = 'all'
         else:
             code = self.check_task(task)
-            series = self.get_task_time_series(code)[date:]
+            if len(sessions):
+                series = sessions.hours[date:][sessions.code[date:] == code]
+            else:
+                series = self.get_task_time_series(code)[date:]
             label = self.get_name_by_code(code)
             
         plt.hist(series, 12, label=label)
@@ -231,6 +283,6 @@ class Visualizer():
         plt.title('Work session time histogram\n({})'.format(period),
                   fontsize=17)
         plt.legend()
-        plt.show()
+        self.show_plot(filename)
 
 